@@ -0,0 +1,160 @@
+"""
+Offline throughput benchmark for the news processor.
+
+Runs the real pipeline (dedup, batching, provider pool, rate limiting, image
+pool, caches) against replay_server.py in a scratch directory, so numbers are
+repeatable and no API quota is spent:
+
+    python benchmark.py --limit 40 --workers 4 --batch-size 5 --latency 1.5
+    python benchmark.py --rate-limit-rate 0.1 --error-rate 0.05 --output bench.json
+
+Reports articles per minute, LLM and image requests per article, estimated
+token cost per article and the per-stage latency table. --repeat N runs the
+same input N times in the same directory; run 2 onwards shows the warm-cache
+(response cache + image cache) path, since the tracking store is reset each run.
+"""
+import os
+import csv
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+from typing import Dict
+
+from replay_server import ReplayServer, add_arguments, config_from_args
+from llm_backends import OpenRouterBackend
+from news_engine import NewsProcessor
+
+logger = logging.getLogger(__name__)
+
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Files a run leaves behind that would turn the next run into "all duplicates"
+RUN_STATE = (
+    "processed_news_master.csv", "processed_tracking.db", "processing_journal.jsonl",
+    "processed_headlines.vec", "processed_headlines.jsonl", "story_groups.csv", "processed_news_archive"
+)
+
+
+def copy_input(source: str, destination: str, limit: int) -> int:
+    """Copy the first 'limit' rows of the scraped CSV (0 = all); returns the row count"""
+    with open(source, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rows = [row for row in reader if row]
+    if limit:
+        rows = rows[:limit]
+    with open(destination, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return len(rows)
+
+
+def replay_providers(chat_url: str, count: int, requests_per_minute: int) -> list:
+    """Provider configs shaped like openrouter_configs_from_env(), all pointing at the replay server"""
+    return [
+        {
+            'name': f"Replay {number}",
+            'api_key': "replay",
+            'base_url': chat_url,
+            'model': f"replay/model-{number}",
+            'requests_per_second': requests_per_minute / 60.0,
+            'requests_per_minute': requests_per_minute
+        }
+        for number in range(1, count + 1)
+    ]
+
+
+def run_once(server: ReplayServer, args, articles: int) -> Dict:
+    for path in RUN_STATE:
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+    before = server.stats.snapshot()
+    backend = OpenRouterBackend(api_configs=replay_providers(server.chat_url, args.providers, args.requests_per_minute))
+    processor = NewsProcessor(backend)
+    processor.image_generator.base_url = server.image_url
+
+    started = time.monotonic()
+    processor.process_all_news(max_workers=args.workers, batch_size=args.batch_size)
+    seconds = time.monotonic() - started
+
+    after = server.stats.snapshot()
+    served = {key: after[key] - before[key] for key in after}
+    processed = len(processor.archive.read_columns(['content_hash']))
+    processor.close()
+
+    per_article = max(processed, 1)
+    tokens = served['prompt_tokens'] + served['completion_tokens']
+    return {
+        'articles_in': articles,
+        'articles_processed': processed,
+        'seconds': round(seconds, 2),
+        'articles_per_minute': round(processed / seconds * 60, 2) if seconds else 0.0,
+        'llm_requests_per_article': round(served['llm_requests'] / per_article, 3),
+        'image_requests_per_article': round(served['image_requests'] / per_article, 3),
+        'tokens_per_article': round(tokens / per_article, 1),
+        'cost_per_article': round(tokens / per_article / 1000 * args.cost_per_1k_tokens, 6),
+        'served': served,
+        'image_cache': processor.image_cache.stats(),
+        'stages': processor.metrics.summary()['stages']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the news processor against the offline replay server")
+    parser.add_argument('--input', default=os.path.join(SOURCE_DIR, "kenyans_news.csv"), help="scraped CSV to replay")
+    parser.add_argument('--limit', type=int, default=30, help="articles to use (0 = all)")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--batch-size', type=int, default=1)
+    parser.add_argument('--providers', type=int, default=5, help="replay providers in the pool")
+    parser.add_argument('--requests-per-minute', type=int, default=600, help="rate limit per replay provider")
+    parser.add_argument('--cost-per-1k-tokens', type=float, default=0.0, help="price used for cost per article")
+    parser.add_argument('--repeat', type=int, default=1, help="runs over the same input (2+ hit the caches)")
+    parser.add_argument('--workdir', help="scratch directory to keep (default: a temporary one, removed afterwards)")
+    parser.add_argument('--output', help="also write the results here as JSON")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="news-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    articles = copy_input(args.input, os.path.join(workdir, "kenyans_news.csv"), args.limit)
+    output = os.path.abspath(args.output) if args.output else None
+
+    original_dir = os.getcwd()
+    os.chdir(workdir)
+    runs = []
+    try:
+        with ReplayServer(config_from_args(args)) as server:
+            for run in range(1, args.repeat + 1):
+                result = run_once(server, args, articles)
+                runs.append(result)
+                print(f"Run {run}: {result['articles_processed']}/{articles} articles in {result['seconds']}s - "
+                      f"{result['articles_per_minute']} articles/min, "
+                      f"{result['llm_requests_per_article']} LLM + {result['image_requests_per_article']} image "
+                      f"requests/article, {result['tokens_per_article']} tokens/article "
+                      f"(${result['cost_per_article']:.6f})")
+    finally:
+        os.chdir(original_dir)
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'settings': {key: value for key, value in vars(args).items() if key not in ('output', 'fixtures')},
+        'runs': runs
+    }
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
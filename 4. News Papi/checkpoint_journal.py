@@ -0,0 +1,92 @@
+import os
+import json
+import logging
+import threading
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('headline', 'description', 'image_prompt', 'image')
+DONE = 'done'
+
+
+class CheckpointJournal:
+    """
+    Append-only JSONL journal of finished pipeline stages, one line per stage:
+        {"item": <content hash>, "stage": "headline", "value": "..."}
+    A restarted run reads back the stages an interrupted item already completed
+    and skips them. Once the item is written to the master CSV a "done" line is
+    appended and the item is dropped the next time the journal is compacted.
+    """
+
+    def __init__(self, path: str = "processing_journal.jsonl"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.items: Dict[str, Dict[str, str]] = {}
+        self.finished = set()  # finished this run; late records (e.g. image callbacks) are ignored
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn last line from a crash mid-write
+                    item, stage = entry.get('item'), entry.get('stage')
+                    if not item or not stage:
+                        continue
+                    if stage == DONE:
+                        self.items.pop(item, None)
+                    else:
+                        self.items.setdefault(item, {})[stage] = entry.get('value')
+        except FileNotFoundError:
+            pass
+
+    def compact(self, is_finished: Optional[Callable[[str], bool]] = None) -> int:
+        """
+        Rewrite the journal with only unfinished items. is_finished lets the caller
+        drop items that were persisted before their "done" line made it to disk.
+        Returns the number of items left to resume.
+        """
+        with self.lock:
+            if is_finished:
+                self.items = {item: stages for item, stages in self.items.items() if not is_finished(item)}
+
+            temp_path = self.path + ".tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                for item, stages in self.items.items():
+                    for stage, value in stages.items():
+                        f.write(json.dumps({'item': item, 'stage': stage, 'value': value}, ensure_ascii=False) + "\n")
+            os.replace(temp_path, self.path)
+
+        if self.items:
+            logger.info(f"Resuming {len(self.items)} partially processed item(s) from {self.path}")
+        return len(self.items)
+
+    def _append(self, entry: Dict) -> None:
+        """Write one complete line per call (caller holds the lock)"""
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+
+    def stages(self, item: str) -> Dict[str, str]:
+        """Stages already completed for an item, as {stage: value}"""
+        with self.lock:
+            return dict(self.items.get(item, {}))
+
+    def record(self, item: str, stage: str, value: str) -> None:
+        if not value:
+            return
+        with self.lock:
+            if item in self.finished:
+                return
+            self.items.setdefault(item, {})[stage] = value
+            self._append({'item': item, 'stage': stage, 'value': value})
+
+    def finish(self, item: str) -> None:
+        with self.lock:
+            self.finished.add(item)
+            if self.items.pop(item, None) is not None:
+                self._append({'item': item, 'stage': DONE})
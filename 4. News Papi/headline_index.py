@@ -0,0 +1,337 @@
+"""
+Embedding index of past headlines, for spotting the same event reported by
+different outlets before any rewriting is paid for.
+
+Vectors come from Ollama's /api/embeddings or, with no model server, from a
+hashed TF-IDF embedding computed in NumPy. Search is one vectorised cosine
+similarity over the whole matrix, which stays well under a millisecond for the
+few thousand headlines this project accumulates.
+
+The index is two append-only files next to the tracking data:
+    processed_headlines.vec    raw float32 rows
+    processed_headlines.jsonl  a header line, then {"id", "headline", "url"} per row
+so inserts never rewrite what is already on disk.
+"""
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+import requests
+
+from near_duplicate import normalize_text, shingles
+
+logger = logging.getLogger(__name__)
+
+SUFFIXES = ('ing', 'ed', 'es', 's', 'e')
+
+
+def stem(token: str) -> str:
+    """Crude suffix stripping so 'floods', 'flooding' and 'flooded' share a feature"""
+    for suffix in SUFFIXES:
+        if len(token) > len(suffix) + 3 and token.endswith(suffix):
+            return token[:-len(suffix)]
+    return token
+
+
+class HashingTfidfEmbedder:
+    """Stemmed unigrams + bigrams hashed into 'dim' buckets with sublinear term frequency; IDF is applied at search time"""
+
+    # Word overlap scores paraphrases lower than a neural embedding does
+    default_threshold = 0.5
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+        self.name = f"tfidf-{dim}"
+
+    def embed(self, text: str) -> Optional[np.ndarray]:
+        tokens = [stem(token) for token in normalize_text(text)]
+        if not tokens:
+            return None
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in tokens + shingles(tokens, 2):
+            bucket = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big') % self.dim
+            vector[bucket] += 1.0
+        nonzero = vector > 0
+        vector[nonzero] = 1.0 + np.log(vector[nonzero])
+        return vector
+
+    def term_weights(self, document_frequency: np.ndarray, rows: int) -> Optional[np.ndarray]:
+        """Smoothed IDF over the indexed headlines, so common words count for little"""
+        return (np.log((1.0 + rows) / (1.0 + document_frequency)) + 1.0).astype(np.float32)
+
+
+class OllamaEmbedder:
+    """Embeddings from a local Ollama server (e.g. ollama pull nomic-embed-text)"""
+
+    default_threshold = 0.85
+
+    def __init__(self, base_url: str = "http://localhost:11434", model: str = "nomic-embed-text", timeout: float = 30):
+        self.base_url = base_url
+        self.model = model
+        self.timeout = timeout
+        self.name = f"ollama-{model}"
+        self.session = requests.Session()
+
+    def embed(self, text: str) -> Optional[np.ndarray]:
+        if not text or not text.strip():
+            return None
+        try:
+            response = self.session.post(
+                f"{self.base_url}/api/embeddings",
+                json={"model": self.model, "prompt": text},
+                timeout=self.timeout
+            )
+            if response.status_code == 200:
+                embedding = response.json().get('embedding')
+                if embedding:
+                    return np.asarray(embedding, dtype=np.float32)
+            logger.warning(f"Ollama embedding failed: {response.status_code} - {response.text[:200]}")
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Ollama embedding request failed: {e}")
+        return None
+
+    def term_weights(self, document_frequency: np.ndarray, rows: int) -> Optional[np.ndarray]:
+        return None
+
+
+class HeadlineIndex:
+    """
+    Cosine-similarity index over processed headlines, persisted with incremental appends.
+    The in-memory matrix grows by doubling, so inserts are amortised O(1).
+
+    Rows are stored unit length, and document frequencies are kept up to date as
+    rows are added. IDF weights and each row's weighted norm are recomputed only
+    once the index has grown by REWEIGHT_GROWTH since the last time (IDF barely
+    moves in between), so a search is one matrix-vector product with no copy of
+    the matrix.
+    """
+
+    REWEIGHT_GROWTH = 0.01
+    NORM_CHUNK = 8192  # rows per block when recomputing weighted norms
+
+    def __init__(self, path_prefix: str = "processed_headlines", embedder=None):
+        self.vectors_path = path_prefix + ".vec"
+        self.meta_path = path_prefix + ".jsonl"
+        self.embedder = embedder or HashingTfidfEmbedder()
+        self.lock = threading.Lock()
+
+        self.items: List[Dict] = []
+        self.matrix: Optional[np.ndarray] = None  # capacity rows; the first len(items) are in use
+        self.dim: Optional[int] = None
+        self.last_row_id = 0
+        self.document_frequency: Optional[np.ndarray] = None
+        self.weights: Optional[np.ndarray] = None
+        self.weighted_norms: Optional[np.ndarray] = None  # capacity entries, like matrix
+        self.weighted_rows = -1  # index size the weights were computed at (-1: never)
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                header = json.loads(f.readline() or '{}')
+                if header.get('embedder') != self.embedder.name:
+                    logger.info(f"Headline index was built with {header.get('embedder')}, rebuilding for {self.embedder.name}")
+                    self._reset_files()
+                    return
+                items = []
+                for line in f:
+                    try:
+                        items.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        break  # torn last line from a crash mid-write
+        except FileNotFoundError:
+            return
+        except (ValueError, OSError) as e:
+            logger.warning(f"Could not read {self.meta_path}, rebuilding the headline index: {e}")
+            self._reset_files()
+            return
+
+        self.dim = header.get('dim')
+        vectors = np.fromfile(self.vectors_path, dtype=np.float32) if os.path.exists(self.vectors_path) else np.zeros(0, np.float32)
+        rows = min(len(items), vectors.size // self.dim) if self.dim else 0
+        torn = rows != len(items) or rows * (self.dim or 0) != vectors.size
+        # One file got a row the other did not (interrupted append) - keep the consistent prefix
+        self.items = items[:rows]
+        self.matrix = vectors[:rows * self.dim].reshape(rows, self.dim) if rows else None
+        if self.matrix is not None:
+            # Indexes written before rows were stored unit length; a no-op otherwise
+            self.matrix /= np.maximum(np.linalg.norm(self.matrix, axis=1), 1e-12)[:, None]
+            self.document_frequency = np.count_nonzero(self.matrix, axis=0).astype(np.int64)
+        if torn:
+            self._rewrite_files()
+        self.last_row_id = max((item['id'] for item in self.items), default=0)
+        logger.info(f"Headline index ready: {len(self.items)} headlines ({self.embedder.name})")
+
+    def _reset_files(self) -> None:
+        for path in (self.vectors_path, self.meta_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.items, self.matrix, self.dim, self.last_row_id = [], None, None, 0
+        self.document_frequency, self.weights, self.weighted_norms, self.weighted_rows = None, None, None, -1
+
+    def _header(self) -> str:
+        return json.dumps({'embedder': self.embedder.name, 'dim': self.dim}) + "\n"
+
+    def _rewrite_files(self) -> None:
+        """Write both files from memory (only needed after a torn append)"""
+        with open(self.meta_path + ".tmp", 'w', encoding='utf-8') as f:
+            f.write(self._header())
+            for item in self.items:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        self._active_rows().tofile(self.vectors_path + ".tmp")
+        os.replace(self.vectors_path + ".tmp", self.vectors_path)
+        os.replace(self.meta_path + ".tmp", self.meta_path)
+
+    def _active_rows(self) -> np.ndarray:
+        if self.matrix is None:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        return self.matrix[:len(self.items)]
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _weighted_norm(self, rows: np.ndarray) -> np.ndarray:
+        if self.weights is None:
+            return np.ones(len(rows), dtype=np.float32)  # unit rows, no weighting
+        return np.sqrt(np.square(rows) @ np.square(self.weights))
+
+    def _refresh_weights(self) -> None:
+        """Recompute IDF and the rows' weighted norms once the index has grown enough (caller holds the lock)"""
+        rows = len(self.items)
+        if self.weighted_rows >= 0 and rows <= self.weighted_rows * (1 + self.REWEIGHT_GROWTH):
+            return
+        self.weights = self.embedder.term_weights(self.document_frequency, rows) if rows else None
+        self.weighted_norms = np.empty(len(self.matrix) if self.matrix is not None else 0, dtype=np.float32)
+        for start in range(0, rows, self.NORM_CHUNK):
+            block = self.matrix[start:start + self.NORM_CHUNK]
+            self.weighted_norms[start:start + len(block)] = self._weighted_norm(block)
+        self.weighted_rows = rows
+
+    def add(self, item_id: int, headline: str, url: str) -> bool:
+        vector = self.embedder.embed(headline)
+        if vector is None:
+            return False
+        vector = (vector / max(float(np.linalg.norm(vector)), 1e-12)).astype(np.float32)
+
+        with self.lock:
+            if self.dim is None:
+                self.dim = len(vector)
+                with open(self.meta_path, 'w', encoding='utf-8') as f:
+                    f.write(self._header())
+            elif len(vector) != self.dim:
+                logger.warning(f"Embedding size changed ({len(vector)} != {self.dim}) - skipping '{headline[:50]}'")
+                return False
+
+            rows = len(self.items)
+            if self.matrix is None or rows == len(self.matrix) or self.weighted_norms is None:
+                capacity = max(64, rows * 2, len(self.matrix) if self.matrix is not None else 0)
+                grown = np.zeros((capacity, self.dim), dtype=np.float32)
+                norms = np.zeros(capacity, dtype=np.float32)
+                if self.matrix is not None:
+                    grown[:rows] = self.matrix[:rows]
+                    if self.weighted_norms is not None:
+                        norms[:len(self.weighted_norms)] = self.weighted_norms[:capacity]
+                self.matrix, self.weighted_norms = grown, norms
+            self.matrix[rows] = vector
+            self.weighted_norms[rows] = self._weighted_norm(vector[None, :])[0]
+            if self.document_frequency is None:
+                self.document_frequency = np.zeros(self.dim, dtype=np.int64)
+            self.document_frequency += vector != 0
+
+            item = {'id': item_id, 'headline': headline, 'url': url}
+            self.items.append(item)
+            self.last_row_id = max(self.last_row_id, item_id)
+
+            # Vector first: a crash in between leaves an extra row that _load trims
+            with open(self.vectors_path, 'ab') as f:
+                vector.tofile(f)
+            with open(self.meta_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        return True
+
+    def current_weights(self) -> Optional[np.ndarray]:
+        """The term weights searches use right now (None: plain cosine)"""
+        with self.lock:
+            if not self.items:
+                return None
+            self._refresh_weights()
+            return self.weights
+
+    def search(self, headline: str, top_k: int = 3, min_similarity: float = 0.0) -> List[Dict]:
+        """Most similar past headlines as dicts with a 'similarity' in [0, 1], best first"""
+        query = self.embedder.embed(headline)
+        with self.lock:
+            rows = len(self.items)
+            if query is None or not rows or len(query) != self.dim:
+                return []
+            self._refresh_weights()
+
+            # cos(q*w, r*w) = r . (q*w*w) / (|r*w| |q*w|), with |r*w| kept per row
+            if self.weights is not None:
+                query = query * self.weights
+                scores = self.matrix[:rows] @ (query * self.weights)
+            else:
+                scores = self.matrix[:rows] @ query
+            similarities = scores / np.maximum(self.weighted_norms[:rows] * (np.linalg.norm(query) or 1.0), 1e-12)
+
+            top_k = min(top_k, rows)
+            best = np.argpartition(-similarities, top_k - 1)[:top_k]
+            best = best[np.argsort(-similarities[best])]
+            return [
+                dict(self.items[position], similarity=float(similarities[position]))
+                for position in best if similarities[position] >= min_similarity
+            ]
+
+    def find_similar(self, headline: str, min_similarity: float) -> Optional[Dict]:
+        matches = self.search(headline, top_k=1, min_similarity=min_similarity)
+        return matches[0] if matches else None
+
+    def backfill(self, tracking_store) -> int:
+        """Index tracked items added since the last run (or all of them on first use)"""
+        added = 0
+        for row_id, headline, url in tracking_store.headlines_since(self.last_row_id):
+            if self.add(row_id, headline or "", url or ""):
+                added += 1
+            self.last_row_id = max(self.last_row_id, row_id)
+        if added:
+            logger.info(f"Indexed {added} previously processed headlines for similarity search")
+        return added
+
+
+class ClaimedHeadlines:
+    """
+    Headlines claimed in the current run but not indexed yet (items are indexed
+    once saved), so the same story from two outlets in one run is caught too.
+    """
+
+    def __init__(self, index: HeadlineIndex):
+        self.index = index
+        self.items: List[Dict] = []
+        self.vectors: List[np.ndarray] = []
+
+    def claim(self, headline: str, url: str, min_similarity: float) -> Optional[Dict]:
+        """Return the most similar headline claimed earlier in this run, or remember this one and return None"""
+        query = self.index.embedder.embed(headline)
+        if query is None:
+            return None
+
+        if self.vectors:
+            matrix = np.vstack(self.vectors)
+            weights = self.index.current_weights()
+            weighted_query = query
+            if weights is not None:
+                matrix = matrix * weights
+                weighted_query = query * weights
+            norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(weighted_query) or 1.0)
+            similarities = (matrix @ weighted_query) / np.maximum(norms, 1e-12)
+            best = int(np.argmax(similarities))
+            if similarities[best] >= min_similarity:
+                return dict(self.items[best], similarity=float(similarities[best]))
+
+        self.items.append({'headline': headline, 'url': url})
+        self.vectors.append(query)
+        return None
@@ -0,0 +1,134 @@
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+import logging
+import threading
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Lowercase and collapse whitespace so trivially different prompts share an image"""
+    return re.sub(r'\s+', ' ', (prompt or "").strip().lower())
+
+
+def prompt_key(prompt: str) -> str:
+    return hashlib.sha256(normalize_prompt(prompt).encode('utf-8')).hexdigest()
+
+
+class ImageCache:
+    """
+    On-disk cache of generated images keyed by normalized-prompt hash.
+    Cached files live in cache_dir with a JSON manifest of {key: size, last_used};
+    when the total size passes max_bytes the least recently used files are removed.
+    Hits are hard-linked (or copied) to the requested path, so evicting a cache
+    entry never touches images already written for earlier articles.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 500 * 1024 * 1024, suffix: str = ".png"):
+        self.cache_dir = cache_dir
+        self.manifest_path = os.path.join(cache_dir, "manifest.json")
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self.entries: Dict[str, Dict] = self._load_manifest()
+
+    def _load_manifest(self) -> Dict[str, Dict]:
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (ValueError, OSError) as e:
+            logger.warning(f"Could not read {self.manifest_path}, starting an empty image cache: {e}")
+            return {}
+
+        # Drop entries whose files were deleted by hand
+        return {key: entry for key, entry in entries.items() if os.path.exists(self._path(key))}
+
+    def _save_manifest(self) -> None:
+        """Write the manifest atomically (caller holds the lock)"""
+        temp_path = self.manifest_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f)
+        os.replace(temp_path, self.manifest_path)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + self.suffix)
+
+    @staticmethod
+    def _link_or_copy(source: str, target: str) -> None:
+        """Place source at target atomically, sharing the file when the filesystem allows"""
+        temp_path = target + ".part"
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        try:
+            os.link(source, temp_path)
+        except OSError:
+            shutil.copyfile(source, temp_path)
+        os.replace(temp_path, target)
+
+    def fetch(self, prompt: str, target_path: str) -> bool:
+        """Copy the cached image for prompt to target_path; False on a miss"""
+        key = prompt_key(prompt)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or not os.path.exists(self._path(key)):
+                self.entries.pop(key, None)
+                self.misses += 1
+                return False
+            try:
+                if not (os.path.exists(target_path) and os.path.samefile(self._path(key), target_path)):
+                    self._link_or_copy(self._path(key), target_path)
+            except OSError as e:
+                logger.warning(f"Image cache read failed: {e}")
+                self.misses += 1
+                return False
+            entry['last_used'] = time.time()
+            self.hits += 1
+            self._save_manifest()
+            return True
+
+    def store(self, prompt: str, image_path: str) -> None:
+        """Add a freshly generated image to the cache"""
+        key = prompt_key(prompt)
+        try:
+            with self.lock:
+                self._link_or_copy(image_path, self._path(key))
+                self.entries[key] = {'size': os.path.getsize(self._path(key)), 'last_used': time.time()}
+                self._evict()
+                self._save_manifest()
+        except OSError as e:
+            logger.warning(f"Image cache write failed: {e}")
+
+    def _evict(self) -> None:
+        """Remove least recently used files until under max_bytes (caller holds the lock)"""
+        total_bytes = sum(entry['size'] for entry in self.entries.values())
+        for key in sorted(self.entries, key=lambda k: self.entries[k]['last_used']):
+            if total_bytes <= self.max_bytes:
+                break
+            total_bytes -= self.entries.pop(key)['size']
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0,
+            'evictions': self.evictions,
+            'entries': len(self.entries),
+            'bytes': sum(entry['size'] for entry in self.entries.values())
+        }
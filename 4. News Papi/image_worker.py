@@ -0,0 +1,119 @@
+import os
+import time
+import logging
+import tempfile
+import threading
+import urllib.parse
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from image_cache import ImageCache, prompt_key
+
+logger = logging.getLogger(__name__)
+
+POLLINATIONS_URL = "https://image.pollinations.ai/prompt/"
+
+
+class ImageGenerator:
+    """
+    Image-generation stage on its own bounded worker pool.
+    All workers share one keep-alive session; bodies are streamed to a temp
+    file in chunks and renamed into place, so a crash never leaves a half image.
+    With a cache, a prompt already rendered (in this run or an earlier one) is
+    reused instead of downloaded, and identical prompts in flight wait for each other.
+    """
+
+    def __init__(self, images_folder: str, max_workers: int = 4, timeout: float = 60,
+                 chunk_size: int = 64 * 1024, cache: Optional[ImageCache] = None, metrics=None,
+                 base_url: str = POLLINATIONS_URL):
+        self.images_folder = images_folder
+        self.base_url = base_url
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.cache = cache
+        self.metrics = metrics  # optional StageMetrics: 'image' downloads, 'image_cache' hits
+        self._prompt_locks = {}
+        self._prompt_locks_guard = threading.Lock()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image")
+        os.makedirs(images_folder, exist_ok=True)
+
+    def generate(self, prompt: str, filename: str) -> Optional[str]:
+        """Render one image and return its file path, or None on failure"""
+        if not prompt or not prompt.strip():
+            logger.error("Image prompt is empty!")
+            return None
+        if not filename or not filename.strip():
+            logger.error("Image filename is empty!")
+            return None
+
+        filepath = os.path.join(self.images_folder, f"{filename}.png")
+        if self.cache is None:
+            return self._timed_download(prompt, filename, filepath)
+
+        with self._prompt_lock(prompt):
+            started = time.monotonic()
+            if self.cache.fetch(prompt, filepath):
+                if self.metrics:
+                    self.metrics.record('image_cache', time.monotonic() - started)
+                logger.info(f"Image reused from cache: {filepath}")
+                return filepath
+            result = self._timed_download(prompt, filename, filepath)
+            if result:
+                self.cache.store(prompt, result)
+            return result
+
+    def _timed_download(self, prompt: str, filename: str, filepath: str) -> Optional[str]:
+        started = time.monotonic()
+        result = self._download(prompt, filename, filepath)
+        if self.metrics:
+            size = os.path.getsize(result) if result and os.path.exists(result) else 0
+            self.metrics.record('image', time.monotonic() - started, result is not None, size)
+        return result
+
+    def _prompt_lock(self, prompt: str) -> threading.Lock:
+        key = prompt_key(prompt)
+        with self._prompt_locks_guard:
+            return self._prompt_locks.setdefault(key, threading.Lock())
+
+    def _download(self, prompt: str, filename: str, filepath: str) -> Optional[str]:
+        url = self.base_url + urllib.parse.quote(prompt.strip())
+        temp_path = None
+        try:
+            with self.session.get(url, timeout=self.timeout, stream=True) as response:
+                if response.status_code != 200:
+                    logger.error(f"Image generation failed: {response.status_code}")
+                    return None
+
+                fd, temp_path = tempfile.mkstemp(dir=self.images_folder, prefix=f".{filename}.", suffix=".part")
+                with os.fdopen(fd, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        if chunk:
+                            f.write(chunk)
+
+            os.replace(temp_path, filepath)
+            temp_path = None
+            logger.info(f"Image created: {filepath}")
+            return filepath
+
+        except Exception as e:
+            logger.error(f"Error creating image: {e}")
+            return None
+        finally:
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def submit(self, prompt: str, filename: str) -> Future:
+        """Queue an image; the Future resolves to the file path or None"""
+        return self.executor.submit(self.generate, prompt, filename)
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True)
+        self.session.close()
@@ -5,9 +5,15 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
+import sys
 import time
 import csv
+import asyncio
 import logging
+from url_filter import ProcessedUrlFilter
+import kenyans_http
+from news_stream import NewsStream
+from stage_metrics import StageMetrics
 
 # Setup logging for better error tracking
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -32,169 +38,253 @@ def setup_driver():
         logger.error(f"Error initializing WebDriver: {e}")
         return None
 
-def scrape_kenyans_news():
-    """Main function to scrape news headlines and descriptions"""
-    driver = setup_driver()
-    if not driver:
-        logger.error("Failed to initialize driver. Exiting.")
-        return
+def filter_processed(headlines_data):
+    """Drop headline links the processor has already handled"""
+    try:
+        url_filter = ProcessedUrlFilter()
+        total_found = len(headlines_data)
+        headlines_data = [h for h in headlines_data if not url_filter.is_processed(h['url'])]
+        logger.info(f"Skipping {total_found - len(headlines_data)} already processed articles, "
+                    f"{len(headlines_data)} new")
+    except Exception as e:
+        logger.warning(f"Could not check processed URLs, visiting every article: {e}")
+    return headlines_data
+
+def collect_headlines_selenium(driver):
+    """Load the news listing in Chrome and return [{'headline', 'url'}], or None on failure"""
+    url = kenyans_http.NEWS_URL
+    logger.info(f"Navigating to {url}")
+    driver.get(url)
+    
+    # Wait for page to load
+    wait = WebDriverWait(driver, 10)
+    wait.until(EC.presence_of_element_located((By.ID, "block-kenyans-content")))
+    
+    # Find all headline links using the CSS selector
+    headline_selector = kenyans_http.HEADLINE_SELECTOR
+    
+    try:
+        # Wait for headlines to load
+        wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, headline_selector)))
+        headline_links = driver.find_elements(By.CSS_SELECTOR, headline_selector)
+        logger.info(f"Found {len(headline_links)} headlines")
+        
+        # Store headline data first to avoid stale element references
+        headlines_data = []
+        for link in headline_links:
+            try:
+                headline_text = link.text.strip()
+                headline_url = link.get_attribute('href')
+                if headline_text and headline_url:
+                    headlines_data.append({
+                        'headline': headline_text,
+                        'url': headline_url
+                    })
+            except Exception as e:
+                logger.warning(f"Error extracting headline data: {e}")
+                continue
+        
+        return headlines_data
+    
+    except TimeoutException:
+        logger.error("Timeout waiting for headlines to load")
+        return None
+    except Exception as e:
+        logger.error(f"Error finding headlines: {e}")
+        return None
+
+def scrape_article_selenium(driver, url):
+    """Open one article in Chrome and return its description text"""
+    driver.get(url)
+    
+    # Wait for article content to load
+    WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.ID, "block-kenyans-content")))
+    time.sleep(2)  # Additional wait for content to fully render
+    
+    # Try multiple XPath selectors for description
+    description = "Description not found"
+    for selector in kenyans_http.DESCRIPTION_SELECTORS:
+        try:
+            description_element = driver.find_element(By.XPATH, selector)
+            description = description_element.text.strip()
+            if description and len(description) > kenyans_http.MIN_DESCRIPTION_LENGTH:  # Ensure we got meaningful content
+                break
+        except NoSuchElementException:
+            continue
+    
+    return description
+
+def scrape_kenyans_news(skip_processed=True, engine="http", concurrency=4, delay=1.0, stream=True):
+    """
+    Main function to scrape news headlines and descriptions.
+    engine="http" reads the static HTML over a pooled session, fetching up to
+    'concurrency' articles at once with 'delay' seconds between request starts,
+    and only starts Chrome for pages that cannot be parsed.
+    engine="selenium" uses Chrome throughout.
+    With stream=True each record is also appended to kenyans_news.jsonl so
+    'news-processor.py --stream' can start on it straight away.
+    """
+    use_http = engine == "http" and kenyans_http.is_available()
+    if engine == "http" and not use_http:
+        logger.warning("lxml not installed - falling back to the Selenium engine")
+    
+    session = kenyans_http.create_session() if use_http else None
+    driver = None
+    metrics = StageMetrics()
+    # Records go to the CSV as soon as each article finishes; closed (and the stream
+    # ended) however the scrape finishes, so a following processor never waits forever
+    writer = CsvRecordWriter(stream=NewsStream() if stream else None)
+    
+    def get_driver():
+        # Chrome is only started if something actually needs it
+        nonlocal driver
+        if driver is None:
+            driver = setup_driver()
+        return driver
     
     try:
-        # Navigate to the news page
-        url = 'https://www.kenyans.co.ke/news'
-        logger.info(f"Navigating to {url}")
-        driver.get(url)
+        headlines_data = kenyans_http.fetch_headlines(session, metrics=metrics) if use_http else []
+        if headlines_data:
+            logger.info(f"Found {len(headlines_data)} headlines in static HTML")
+        else:
+            if use_http:
+                logger.warning("Static parse of the listing failed - using Selenium")
+            if not get_driver():
+                logger.error("Failed to initialize driver. Exiting.")
+                return
+            headlines_data = collect_headlines_selenium(driver)
+            if headlines_data is None:
+                return
         
-        # Wait for page to load
-        wait = WebDriverWait(driver, 10)
-        wait.until(EC.presence_of_element_located((By.ID, "block-kenyans-content")))
+        logger.info(f"Successfully extracted {len(headlines_data)} headline URLs")
         
-        data = []
+        # Skip article pages the processor has already handled
+        if skip_processed:
+            headlines_data = filter_processed(headlines_data)
         
-        # Find all headline links using the CSS selector
-        headline_selector = '#block-kenyans-content div.view-content div ul li div h2 a'
+        selenium_queue = headlines_data
         
-        try:
-            # Wait for headlines to load
-            wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, headline_selector)))
-            headline_links = driver.find_elements(By.CSS_SELECTOR, headline_selector)
-            logger.info(f"Found {len(headline_links)} headlines")
-            
-            # Store headline data first to avoid stale element references
-            headlines_data = []
-            for link in headline_links:
-                try:
-                    headline_text = link.text.strip()
-                    headline_url = link.get_attribute('href')
-                    if headline_text and headline_url:
-                        headlines_data.append({
-                            'headline': headline_text,
-                            'url': headline_url
-                        })
-                except Exception as e:
-                    logger.warning(f"Error extracting headline data: {e}")
-                    continue
-            
-            logger.info(f"Successfully extracted {len(headlines_data)} headline URLs")
-            
-            # Now visit each article to get descriptions
-            for index, headline_data in enumerate(headlines_data, 1):
-                try:
-                    logger.info(f"Processing article {index}/{len(headlines_data)}: {headline_data['headline'][:50]}...")
-                    
-                    # Navigate to the article
-                    driver.get(headline_data['url'])
-                    
-                    # Wait for article content to load
-                    wait.until(EC.presence_of_element_located((By.ID, "block-kenyans-content")))
-                    time.sleep(2)  # Additional wait for content to fully render
-                    
-                    # Try multiple XPath selectors for description
-                    description_selectors = [
-                        '//*[@id="block-kenyans-content"]/article/div/div[4]/div/div[2]/div',  # Your provided XPath
-                        '//*[@id="block-kenyans-content"]/article/div/div/div/div/div',      # Alternative
-                        '//article//div[contains(@class, "field-type-text-with-summary")]', # Generic content
-                        '//article//div[contains(@class, "content")]',                      # Another generic
-                        '//article//p'  # Fallback to paragraphs
-                    ]
-                    
-                    description = "Description not found"
-                    for selector in description_selectors:
-                        try:
-                            if selector.startswith('//'):
-                                description_element = driver.find_element(By.XPATH, selector)
-                            else:
-                                description_element = driver.find_element(By.XPATH, selector)
-                            
-                            description = description_element.text.strip()
-                            if description and len(description) > 20:  # Ensure we got meaningful content
-                                break
-                        except NoSuchElementException:
-                            continue
-                    
-                    # Store the complete data
-                    article_data = {
-                        'headline': headline_data['headline'],
-                        'description': description,
-                        'url': headline_data['url']
-                    }
-                    data.append(article_data)
-                    
-                    logger.info(f"✓ Article {index} processed successfully")
-                    
-                    # Small delay to be respectful to the server
-                    time.sleep(1)
-                    
-                except Exception as e:
-                    logger.error(f"Error processing article {index}: {e}")
-                    # Still add the headline even if description fails
-                    data.append({
-                        'headline': headline_data['headline'],
-                        'description': f"Error retrieving description: {str(e)}",
-                        'url': headline_data['url']
-                    })
-                    continue
+        if use_http and headlines_data:
+            logger.info(f"Fetching {len(headlines_data)} articles, {concurrency} at a time")
+            selenium_queue = asyncio.run(kenyans_http.fetch_descriptions_async(
+                session, headlines_data, on_record=writer.write, concurrency=concurrency, delay=delay,
+                metrics=metrics
+            ))
+            if selenium_queue:
+                logger.info(f"Static parse failed for {len(selenium_queue)} articles, rendering with Selenium")
         
-        except TimeoutException:
-            logger.error("Timeout waiting for headlines to load")
-            return
-        except Exception as e:
-            logger.error(f"Error finding headlines: {e}")
-            return
+        # Selenium engine, or leftovers the static parse could not read
+        for index, headline_data in enumerate(selenium_queue, 1):
+            try:
+                logger.info(f"Processing article {index}/{len(selenium_queue)}: {headline_data['headline'][:50]}...")
+                
+                if not get_driver():
+                    raise RuntimeError("Selenium driver unavailable")
+                with metrics.time('scrape'):
+                    description = scrape_article_selenium(driver, headline_data['url'])
+                
+                # Store the complete data
+                writer.write({
+                    'headline': headline_data['headline'],
+                    'description': description,
+                    'url': headline_data['url']
+                })
+                
+                logger.info(f"✓ Article {index} processed successfully")
+                
+                # Small delay to be respectful to the server
+                time.sleep(delay)
+                
+            except Exception as e:
+                logger.error(f"Error processing article {index}: {e}")
+                # Still add the headline even if description fails
+                writer.write({
+                    'headline': headline_data['headline'],
+                    'description': f"Error retrieving description: {str(e)}",
+                    'url': headline_data['url']
+                })
+                continue
         
-        # Save data to CSV
-        if data:
-            save_to_csv(data)
+        writer.close()
+        metrics.write_json('scrape_metrics.json')
+        if writer.records:
+            print_summary(writer.records, writer.csv_filename)
         else:
             logger.warning("No data collected to save")
             
     except Exception as e:
         logger.error(f"Unexpected error during scraping: {e}")
     finally:
+        writer.close()
+        if session:
+            session.close()
         # Always close the driver
-        driver.quit()
-        logger.info("Driver closed successfully")
+        if driver:
+            driver.quit()
+            logger.info("Driver closed successfully")
 
-def save_to_csv(data):
-    """Save scraped data to CSV file"""
-    csv_filename = 'kenyans_news.csv'
+class CsvRecordWriter:
+    """Write scraped records to the CSV one by one as they arrive (and to the processor's stream)"""
     
-    try:
-        with open(csv_filename, mode='w', newline='', encoding='utf-8') as file:
-            fieldnames = ['headline', 'description', 'url']
-            writer = csv.DictWriter(file, fieldnames=fieldnames)
-            
-            # Write header
-            writer.writeheader()
-            
-            # Write data
-            for row in data:
-                writer.writerow(row)
-        
-        logger.info(f"✓ Successfully saved {len(data)} articles to {csv_filename}")
-        
-        # Print summary
-        print(f"\n{'='*60}")
-        print(f"SCRAPING COMPLETED SUCCESSFULLY")
-        print(f"{'='*60}")
-        print(f"Total articles scraped: {len(data)}")
-        print(f"Data saved to: {csv_filename}")
-        print(f"{'='*60}")
-        
-        # Print first few headlines as preview
-        print("\nPreview of scraped headlines:")
-        for i, item in enumerate(data[:3], 1):
-            print(f"{i}. {item['headline']}")
-            print(f"   Description: {item['description'][:100]}...")
-            print(f"   URL: {item['url']}")
-            print()
-            
-    except Exception as e:
-        logger.error(f"Error saving to CSV: {e}")
+    def __init__(self, csv_filename='kenyans_news.csv', stream=None):
+        self.csv_filename = csv_filename
+        self.stream = stream
+        self.records = []
+        self.file = None
+        self.writer = None
+    
+    def write(self, record):
+        if self.stream:
+            try:
+                self.stream.append(record)
+            except Exception as e:
+                logger.error(f"Error appending to stream: {e}")
+        try:
+            if self.file is None:
+                # The previous scrape is only replaced once there is something new to write
+                self.file = open(self.csv_filename, mode='w', newline='', encoding='utf-8')
+                self.writer = csv.DictWriter(self.file, fieldnames=['headline', 'description', 'url'])
+                self.writer.writeheader()
+            self.writer.writerow(record)
+            self.file.flush()
+            self.records.append(record)
+        except Exception as e:
+            logger.error(f"Error saving to CSV: {e}")
+    
+    def close(self):
+        """End the stream and close the CSV; safe to call more than once"""
+        if self.stream:
+            try:
+                self.stream.mark_end()
+            except Exception as e:
+                logger.error(f"Error ending stream: {e}")
+            self.stream = None
+        if self.file:
+            self.file.close()
+            self.file = None
+            logger.info(f"✓ Successfully saved {len(self.records)} articles to {self.csv_filename}")
+
+def print_summary(data, csv_filename):
+    """Print the end-of-scrape summary and a preview of the first headlines"""
+    print(f"\n{'='*60}")
+    print(f"SCRAPING COMPLETED SUCCESSFULLY")
+    print(f"{'='*60}")
+    print(f"Total articles scraped: {len(data)}")
+    print(f"Data saved to: {csv_filename}")
+    print(f"{'='*60}")
+    
+    # Print first few headlines as preview
+    print("\nPreview of scraped headlines:")
+    for i, item in enumerate(data[:3], 1):
+        print(f"{i}. {item['headline']}")
+        print(f"   Description: {item['description'][:100]}...")
+        print(f"   URL: {item['url']}")
+        print()
 
 if __name__ == "__main__":
     print("Starting Kenyans.co.ke News Scraper...")
-    print("Make sure you have Chrome and ChromeDriver installed!")
+    print("Chrome and ChromeDriver are only needed for pages the static HTML parse cannot read")
+    print("(pass --selenium to force the browser engine)")
     print("-" * 50)
     
-    scrape_kenyans_news()
+    scrape_kenyans_news(engine="selenium" if "--selenium" in sys.argv else "http")
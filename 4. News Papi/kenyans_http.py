@@ -0,0 +1,219 @@
+"""
+Static HTTP engine for kenyans.co.ke.
+
+Headlines and article text are present in the server-rendered HTML, so they
+can be read with a pooled requests.Session and lxml instead of a full Chrome
+instance. Every function returns None / [] when the static parse fails so the
+caller can fall back to Selenium.
+
+Check the selectors against the saved pages in fixtures/ with:
+    python kenyans_http.py --fixtures
+"""
+import os
+import re
+import sys
+import time
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urljoin, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    from lxml import html as lxml_html
+except ImportError:  # Selenium-only installs still work, just without the fast path
+    lxml_html = None
+
+logger = logging.getLogger(__name__)
+
+NEWS_URL = 'https://www.kenyans.co.ke/news'
+
+# Same selectors the Selenium scraper uses; the CSS one is spelled out as XPath for lxml
+HEADLINE_SELECTOR = '#block-kenyans-content div.view-content div ul li div h2 a'
+HEADLINE_XPATH = (
+    '//*[@id="block-kenyans-content"]'
+    '//div[contains(concat(" ", normalize-space(@class), " "), " view-content ")]'
+    '//div//ul//li//div//h2//a'
+)
+DESCRIPTION_SELECTORS = [
+    '//*[@id="block-kenyans-content"]/article/div/div[4]/div/div[2]/div',  # Your provided XPath
+    '//*[@id="block-kenyans-content"]/article/div/div/div/div/div',      # Alternative
+    '//article//div[contains(@class, "field-type-text-with-summary")]', # Generic content
+    '//article//div[contains(@class, "content")]',                      # Another generic
+    '//article//p'  # Fallback to paragraphs
+]
+MIN_DESCRIPTION_LENGTH = 20
+
+USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/126.0 Safari/537.36"
+)
+
+
+def is_available() -> bool:
+    return lxml_html is not None
+
+
+def create_session(pool_size: int = 10) -> requests.Session:
+    """Keep-alive session with a connection pool and polite retries"""
+    session = requests.Session()
+    retries = Retry(total=3, backoff_factor=1.0, status_forcelist=[429, 500, 502, 503, 504],
+                    respect_retry_after_header=True)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'User-Agent': USER_AGENT})
+    return session
+
+
+def _element_text(element) -> str:
+    """Visible text of an element, whitespace collapsed like a browser would render it"""
+    for hidden in element.xpath('.//script | .//style'):
+        hidden.drop_tree()
+    return re.sub(r'\s+', ' ', ' '.join(element.itertext())).strip()
+
+
+def parse_headlines(page_html: str, base_url: str = NEWS_URL) -> List[Dict[str, str]]:
+    """Extract [{'headline', 'url'}] from the news listing page"""
+    if not lxml_html or not page_html:
+        return []
+
+    tree = lxml_html.fromstring(page_html)
+    headlines = []
+    for link in tree.xpath(HEADLINE_XPATH):
+        headline_text = _element_text(link)
+        href = link.get('href')
+        if headline_text and href:
+            headlines.append({'headline': headline_text, 'url': urljoin(base_url, href)})
+    return headlines
+
+
+def parse_description(page_html: str) -> Optional[str]:
+    """Extract the article text using the first description selector that yields real content"""
+    if not lxml_html or not page_html:
+        return None
+
+    tree = lxml_html.fromstring(page_html)
+    for selector in DESCRIPTION_SELECTORS:
+        matches = tree.xpath(selector)
+        if not matches:
+            continue
+        description = _element_text(matches[0])
+        if description and len(description) > MIN_DESCRIPTION_LENGTH:
+            return description
+    return None
+
+
+def fetch_html(session: requests.Session, url: str, timeout: float = 15, metrics=None) -> Optional[str]:
+    """GET a page; with a StageMetrics, each fetch is recorded under the 'scrape' stage"""
+    started = time.monotonic()
+    ok, size = False, 0
+    try:
+        response = session.get(url, timeout=timeout)
+        size = len(response.content)
+        if response.status_code == 200:
+            ok = True
+            return response.text
+        logger.warning(f"HTTP {response.status_code} for {url}")
+    except requests.exceptions.RequestException as e:
+        logger.warning(f"Request failed for {url}: {e}")
+    finally:
+        if metrics:
+            metrics.record('scrape', time.monotonic() - started, ok, size)
+    return None
+
+
+def fetch_headlines(session: requests.Session, url: str = NEWS_URL, metrics=None) -> List[Dict[str, str]]:
+    return parse_headlines(fetch_html(session, url, metrics=metrics), base_url=url)
+
+
+def fetch_description(session: requests.Session, url: str, metrics=None) -> Optional[str]:
+    return parse_description(fetch_html(session, url, metrics=metrics))
+
+
+class HostThrottle:
+    """Per-host concurrency cap plus a minimum gap between request starts"""
+
+    def __init__(self, concurrency: int = 4, delay: float = 1.0):
+        self.concurrency = max(1, concurrency)
+        self.delay = delay
+        self.semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.locks: Dict[str, asyncio.Lock] = {}
+        self.last_start: Dict[str, float] = {}
+
+    def semaphore(self, host: str) -> asyncio.Semaphore:
+        if host not in self.semaphores:
+            self.semaphores[host] = asyncio.Semaphore(self.concurrency)
+        return self.semaphores[host]
+
+    async def wait_turn(self, host: str) -> None:
+        lock = self.locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            wait = self.last_start.get(host, 0.0) + self.delay - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self.last_start[host] = time.monotonic()
+
+
+async def fetch_descriptions_async(session: requests.Session, headlines: List[Dict[str, str]],
+                                   on_record: Callable[[Dict[str, str]], None],
+                                   concurrency: int = 4, delay: float = 1.0, metrics=None) -> List[Dict[str, str]]:
+    """
+    Fetch article descriptions concurrently, politely per host.
+    Each finished {headline, description, url} record is handed to on_record as
+    soon as it is ready; headlines whose static parse failed are returned so the
+    caller can retry them with Selenium.
+    """
+    throttle = HostThrottle(concurrency, delay)
+    failed: List[Dict[str, str]] = []
+
+    async def fetch_one(headline_data: Dict[str, str]) -> None:
+        host = urlparse(headline_data['url']).netloc
+        async with throttle.semaphore(host):
+            await throttle.wait_turn(host)
+            # requests is blocking; the pooled session is shared across worker threads
+            description = await asyncio.to_thread(fetch_description, session, headline_data['url'], metrics)
+
+        if description is None:
+            failed.append(headline_data)
+            return
+        on_record({
+            'headline': headline_data['headline'],
+            'description': description,
+            'url': headline_data['url']
+        })
+
+    await asyncio.gather(*(fetch_one(headline_data) for headline_data in headlines))
+    return failed
+
+
+def check_fixtures(fixtures_dir: str = 'fixtures') -> bool:
+    """Run the parsers over the saved HTML pages and report what they extract"""
+    if not is_available():
+        print("lxml is not installed - pip install lxml")
+        return False
+
+    ok = True
+    with open(os.path.join(fixtures_dir, 'kenyans_news_listing.html'), encoding='utf-8') as f:
+        headlines = parse_headlines(f.read())
+    print(f"Listing: {len(headlines)} headlines")
+    for item in headlines:
+        print(f"  {item['headline']} -> {item['url']}")
+    ok = ok and len(headlines) > 0
+
+    with open(os.path.join(fixtures_dir, 'kenyans_article.html'), encoding='utf-8') as f:
+        description = parse_description(f.read())
+    print(f"Article: {description[:100] + '...' if description else 'NO DESCRIPTION FOUND'}")
+    ok = ok and description is not None
+
+    print("Fixtures OK" if ok else "Fixture check FAILED")
+    return ok
+
+
+if __name__ == "__main__":
+    if '--fixtures' in sys.argv:
+        sys.exit(0 if check_fixtures(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')) else 1)
+    print("Usage: python kenyans_http.py --fixtures")
@@ -0,0 +1,84 @@
+import re
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+THINK_PATTERN = re.compile(r'<think>.*?</think>', flags=re.DOTALL)
+FENCE_PATTERN = re.compile(r'```(?:json)?\s*(.*?)```', flags=re.DOTALL)
+
+
+def _find_balanced(text: str, opening: str, closing: str) -> Optional[str]:
+    """Return the first balanced {...} / [...] block in text, ignoring brackets inside strings"""
+    start = text.find(opening)
+    while start != -1:
+        depth = 0
+        in_string = False
+        escaped = False
+        for position in range(start, len(text)):
+            char = text[position]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == '\\':
+                    escaped = True
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char == opening:
+                depth += 1
+            elif char == closing:
+                depth -= 1
+                if depth == 0:
+                    return text[start:position + 1]
+        start = text.find(opening, start + 1)
+    return None
+
+
+def extract_json(text: Optional[str], expect: str = 'object') -> Optional[Any]:
+    """
+    Pull a JSON object (or array) out of a chatty model reply.
+    Handles <think> blocks, ```json fences and prose around the payload.
+    """
+    if not text:
+        return None
+
+    cleaned = THINK_PATTERN.sub('', text).strip()
+    fenced = FENCE_PATTERN.search(cleaned)
+    if fenced:
+        cleaned = fenced.group(1).strip()
+
+    opening, closing = ('{', '}') if expect == 'object' else ('[', ']')
+    candidate = _find_balanced(cleaned, opening, closing)
+    if not candidate:
+        logger.debug(f"No JSON {expect} found in response: {cleaned[:100]}")
+        return None
+
+    try:
+        return json.loads(candidate)
+    except json.JSONDecodeError as e:
+        logger.debug(f"Invalid JSON in response: {e}")
+        return None
+
+
+def validate_text_fields(data: Any, fields: List[str], max_lengths: Optional[Dict[str, int]] = None) -> Dict[str, str]:
+    """Keep only the requested fields that are non-empty strings within their length limit"""
+    valid = {}
+    if not isinstance(data, dict):
+        return valid
+
+    max_lengths = max_lengths or {}
+    for field in fields:
+        value = data.get(field)
+        if not isinstance(value, str):
+            continue
+        value = value.strip().strip('"').strip()
+        if not value:
+            continue
+        if field in max_lengths and len(value) > max_lengths[field]:
+            logger.debug(f"Field '{field}' too long ({len(value)} chars)")
+            continue
+        valid[field] = value
+    return valid
@@ -0,0 +1,156 @@
+import re
+import hashlib
+import logging
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_BITS = 64
+TOKEN_PATTERN = re.compile(r'\w+', flags=re.UNICODE)
+
+
+def normalize_text(text: str) -> List[str]:
+    """Lowercase and tokenise, dropping punctuation and spacing differences"""
+    return TOKEN_PATTERN.findall((text or "").lower())
+
+
+def shingles(tokens: List[str], size: int = 2) -> List[str]:
+    if len(tokens) < size:
+        return [" ".join(tokens)] if tokens else []
+    return [" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)]
+
+
+def simhash(features: List[str]) -> int:
+    """64-bit SimHash: similar feature sets give fingerprints a small Hamming distance apart"""
+    weights = [0] * FINGERPRINT_BITS
+    for feature in features:
+        value = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+class NearDuplicateIndex:
+    """
+    SimHash near-duplicate detector backed by the tracking store.
+    Fingerprints are split into 'bands' equal chunks stored in an indexed table;
+    by the pigeonhole principle any fingerprint within max_distance < bands bits
+    shares at least one band exactly, so only those candidates are compared.
+    The store remembers the band count and re-splits when it changes.
+    """
+
+    def __init__(self, tracking_store, max_distance: int = 3, bands: int = 4,
+                 shingle_size: int = 2, min_features: int = 8):
+        if FINGERPRINT_BITS % bands:
+            raise ValueError(f"bands must divide {FINGERPRINT_BITS}")
+        if max_distance >= bands:
+            logger.warning(f"max_distance {max_distance} >= bands {bands}: some near-duplicates may be missed")
+
+        self.store = tracking_store
+        self.max_distance = max_distance
+        self.bands = bands
+        self.band_bits = FINGERPRINT_BITS // bands
+        self.shingle_size = shingle_size
+        self.min_features = min_features
+        # Stored bands from another max_distance would never match - re-split them
+        self.store.use_band_layout(bands, self.band_values)
+
+    def fingerprint(self, headline: str, description: str) -> Optional[int]:
+        """Fingerprint headline + description, or None if there is too little text to judge"""
+        features = shingles(normalize_text(f"{headline} {description}"), self.shingle_size)
+        if len(features) < self.min_features:
+            return None
+        return simhash(features)
+
+    def band_values(self, fingerprint: int) -> List[int]:
+        mask = (1 << self.band_bits) - 1
+        return [fingerprint >> (band * self.band_bits) & mask for band in range(self.bands)]
+
+    def find(self, headline: str, description: str) -> Optional[Dict]:
+        """Return the closest earlier item within max_distance (with its distance), or None"""
+        fingerprint = self.fingerprint(headline, description)
+        if fingerprint is None:
+            return None
+
+        best = None
+        for candidate in self.store.fingerprint_candidates(self.band_values(fingerprint)):
+            distance = hamming_distance(fingerprint, candidate['fingerprint'])
+            if distance <= self.max_distance and (best is None or distance < best['distance']):
+                best = dict(candidate, distance=distance)
+        return best
+
+    def add(self, item_id: int, headline: str, description: str) -> None:
+        fingerprint = self.fingerprint(headline, description)
+        # Items too short to fingerprint are still marked so backfill skips them
+        bands = self.band_values(fingerprint) if fingerprint is not None else []
+        self.store.add_fingerprint(item_id, fingerprint, bands)
+
+    def backfill(self, load_rows: Callable[[], Iterable[Dict]], source: str) -> int:
+        """Fingerprint items tracked before near-duplicate detection existed, from master rows.
+        load_rows is only called when some tracked item still lacks a fingerprint."""
+        missing = self.store.items_without_fingerprint()
+        if not missing:
+            return 0
+
+        added = 0
+        try:
+            for row in load_rows():
+                item_id = missing.pop(row.get('url'), None)
+                if item_id is not None:
+                    self.add(item_id, row.get('original_headline', ''), row.get('original_description', ''))
+                    added += 1
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Error backfilling fingerprints from {source}: {e}")
+            return added
+
+        # No text on record for the rest - mark them so the rows are not rescanned next start
+        for item_id in missing.values():
+            self.store.add_fingerprint(item_id, None, [])
+
+        if added:
+            logger.info(f"Fingerprinted {added} previously processed items for near-duplicate checks")
+        return added
+
+
+class ClaimedFingerprints:
+    """
+    Fingerprints of items claimed in the current run, banded like the store.
+    The store only learns about an item once it is saved, so without this two
+    copies of a story arriving in the same run would never be compared.
+    """
+
+    def __init__(self, index: NearDuplicateIndex):
+        self.index = index
+        self.bands: Dict[Tuple[int, int], List[Dict]] = {}  # (band, value) -> claimed items
+
+    def claim(self, headline: str, description: str, url: str) -> Optional[Dict]:
+        """Return the closest item claimed earlier in this run, or remember this one and return None"""
+        fingerprint = self.index.fingerprint(headline, description)
+        if fingerprint is None:
+            return None
+
+        keys = list(enumerate(self.index.band_values(fingerprint)))
+        best = None
+        for key in keys:
+            for candidate in self.bands.get(key, []):
+                distance = hamming_distance(fingerprint, candidate['fingerprint'])
+                if distance <= self.index.max_distance and (best is None or distance < best['distance']):
+                    best = dict(candidate, distance=distance)
+        if best:
+            return best
+
+        item = {'fingerprint': fingerprint, 'headline': headline, 'url': url}
+        for key in keys:
+            self.bands.setdefault(key, []).append(item)
+        return None
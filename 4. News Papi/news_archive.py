@@ -0,0 +1,324 @@
+"""
+Columnar archive of processed news, replacing the row-at-a-time master CSV.
+
+Rows are buffered and written in batches as Parquet files, partitioned by the
+day they were processed:
+
+    processed_news_archive/
+        staging.jsonl                           rows not yet in a Parquet file
+        processed_day=2025-06-01/part-<id>.parquet
+        processed_day=2025-06-02/part-<id>.parquet
+
+Every appended row goes to staging.jsonl straight away (one open file handle,
+flushed per row), so a crash loses nothing: the next start writes the staged
+rows out. Partitions with many small batch files are compacted into one file.
+
+Readers load only the columns they ask for:
+
+    NewsArchive().read_columns(['image_filepath', 'rewritten_headline'])
+
+processed_news_master.csv is still appended batch by batch for scripts and
+people that expect it, and can be rebuilt from the archive at any time:
+
+    python news_archive.py export-csv
+    python news_archive.py compact
+    python news_archive.py info
+
+Without pyarrow the archive degrades to what the project did before: the
+master CSV is the store, and reads go through the csv module.
+"""
+import os
+import csv
+import json
+import glob
+import time
+import hashlib
+import logging
+import argparse
+import threading
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # CSV-only installs still work, just without the columnar store
+    pa = None
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+MASTER_FIELDS = [
+    'original_headline', 'rewritten_headline',
+    'original_description', 'rewritten_description',
+    'image_prompt', 'image_filepath', 'url',
+    'content_hash', 'processed_date'
+]
+PARTITION_KEY = 'processed_day'
+MASTER_CSV = "processed_news_master.csv"
+
+
+def is_available() -> bool:
+    return pq is not None
+
+
+def processed_day(row: Dict) -> str:
+    """Partition for a row: the date part of its ISO processed_date"""
+    return (row.get('processed_date') or "")[:10] or "unknown"
+
+
+class NewsArchive:
+    """
+    Batched, day-partitioned Parquet store for master rows, with CSV export.
+    append() is thread-safe; call close() (or flush()) when a run ends.
+    """
+
+    def __init__(self, root: str = "processed_news_archive", csv_path: Optional[str] = MASTER_CSV,
+                 batch_size: int = 50, compact_after: int = 8, readonly: bool = False):
+        self.root = root
+        self.csv_path = csv_path  # None: no CSV copy (Parquet only)
+        self.staging_path = os.path.join(root, "staging.jsonl")
+        self.batch_size = max(1, batch_size)
+        self.compact_after = compact_after  # batch files per partition before they are merged
+        self.lock = threading.Lock()
+        self.buffer: List[Dict] = []
+        self.staging = None
+        if readonly:
+            # Readers (e.g. the overlay script) see staged rows but never write anything
+            self.buffer = self._staged_rows()
+            return
+        os.makedirs(root, exist_ok=True)
+        self._recover()
+        self.staging = open(self.staging_path, 'a', encoding='utf-8')
+
+    def _staged_rows(self) -> List[Dict]:
+        rows = []
+        try:
+            with open(self.staging_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        rows.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue  # torn last line from a crash mid-write
+        except FileNotFoundError:
+            pass
+        return rows
+
+    def _recover(self) -> None:
+        """Write out rows staged by a run that ended before its last flush"""
+        if not os.path.exists(self.staging_path):
+            return
+        rows = self._staged_rows()
+        if rows:
+            logger.info(f"Archiving {len(rows)} row(s) staged by an earlier run")
+            self._write_batch(rows, recovering=True)
+        os.remove(self.staging_path)
+
+    def append(self, row: Dict) -> None:
+        row = {field: "" if row.get(field) is None else str(row.get(field)) for field in MASTER_FIELDS}
+        with self.lock:
+            self.staging.write(json.dumps(row, ensure_ascii=False) + "\n")
+            self.staging.flush()
+            self.buffer.append(row)
+            if len(self.buffer) >= self.batch_size:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self.lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self.buffer:
+            return
+        self._write_batch(self.buffer)
+        self.buffer = []
+        self.staging.seek(0)
+        self.staging.truncate()
+
+    def _write_batch(self, rows: List[Dict], recovering: bool = False) -> None:
+        if pq is not None:
+            by_day: Dict[str, List[Dict]] = {}
+            for row in rows:
+                by_day.setdefault(processed_day(row), []).append(row)
+            for day, day_rows in by_day.items():
+                self._write_part(day, day_rows)
+        if self.csv_path:
+            self._append_csv(rows, skip_existing=recovering)
+
+    def _partition_dir(self, day: str) -> str:
+        return os.path.join(self.root, f"{PARTITION_KEY}={day}")
+
+    def _write_part(self, day: str, rows: List[Dict]) -> None:
+        # Named after its contents, so re-writing the same staged rows after a crash is a no-op
+        batch_id = hashlib.blake2b("\0".join(row['content_hash'] for row in rows).encode('utf-8'),
+                                   digest_size=8).hexdigest()
+        directory = self._partition_dir(day)
+        path = os.path.join(directory, f"part-{batch_id}.parquet")
+        if os.path.exists(path):
+            return
+        os.makedirs(directory, exist_ok=True)
+        table = pa.Table.from_pylist(rows, schema=self._schema())
+        pq.write_table(table, path + ".tmp", compression='zstd')
+        os.replace(path + ".tmp", path)
+
+        if self.compact_after and len(glob.glob(os.path.join(directory, "*.parquet"))) > self.compact_after:
+            self._compact_partition(directory)
+
+    @staticmethod
+    def _schema():
+        return pa.schema([(field, pa.string()) for field in MASTER_FIELDS])
+
+    def _append_csv(self, rows: List[Dict], skip_existing: bool = False) -> None:
+        if skip_existing:
+            known = {row.get('content_hash') for row in self._read_csv(['content_hash'])}
+            rows = [row for row in rows if row['content_hash'] not in known]
+        if not rows:
+            return
+        file_exists = os.path.exists(self.csv_path)
+        with open(self.csv_path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=MASTER_FIELDS)
+            if not file_exists:
+                writer.writeheader()
+            writer.writerows(rows)
+
+    def _compact_partition(self, directory: str) -> bool:
+        parts = sorted(glob.glob(os.path.join(directory, "part-*.parquet")), key=os.path.getmtime)
+        if len(parts) < 2:
+            return False
+        table = pa.concat_tables([pq.read_table(part, schema=self._schema()) for part in parts])
+        merged = os.path.join(directory, f"part-c{int(time.time() * 1000)}.parquet")
+        pq.write_table(table, merged + ".tmp", compression='zstd')
+        os.replace(merged + ".tmp", merged)
+        # A crash here leaves rows in two files; readers drop the repeats by content_hash
+        for part in parts:
+            os.remove(part)
+        return True
+
+    def compact(self) -> int:
+        """Merge every partition's batch files into one; returns partitions compacted"""
+        if pq is None:
+            return 0
+        with self.lock:
+            return sum(self._compact_partition(directory) for directory in self._partitions())
+
+    def _partitions(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.root, f"{PARTITION_KEY}=*")))
+
+    def close(self) -> None:
+        if self.staging is None:
+            return
+        with self.lock:
+            self._flush_locked()
+            self.staging.close()
+
+    def _read_csv(self, columns: Optional[List[str]]) -> List[Dict]:
+        if not self.csv_path or not os.path.exists(self.csv_path):
+            return []
+        with open(self.csv_path, 'r', newline='', encoding='utf-8') as f:
+            return [
+                {column: row.get(column, "") for column in columns} if columns else row
+                for row in csv.DictReader(f)
+            ]
+
+    def read_columns(self, columns: Optional[List[str]] = None, days: Optional[Iterable[str]] = None) -> List[Dict]:
+        """
+        Archived rows as dicts holding only the requested columns (all when None),
+        oldest first, including rows still waiting in the current batch.
+        days limits the read to those processed_day partitions (YYYY-MM-DD).
+        """
+        wanted_days = set(days) if days is not None else None
+        with self.lock:
+            pending = [row for row in self.buffer if wanted_days is None or processed_day(row) in wanted_days]
+        if pq is None:
+            rows = self._read_csv(None if columns is None else sorted(set(columns) | {'processed_date', 'content_hash'}))
+            if wanted_days is not None:
+                rows = [row for row in rows if processed_day(row) in wanted_days]
+            # Buffered rows reach the CSV on the next flush; a crash mid-flush can leave them in both
+            seen = {row.get('content_hash') for row in rows}
+        else:
+            rows, seen = self._read_parquet(columns, wanted_days)
+        pending = [row for row in pending if row['content_hash'] not in seen]
+        rows.extend(pending)
+        if columns is None:
+            return rows
+        return [{column: row.get(column) for column in columns} for row in rows]
+
+    def _read_parquet(self, columns: Optional[List[str]], wanted_days: Optional[set]):
+        """Rows from every matching batch file, first copy of each content_hash only"""
+        read_columns = None if columns is None else list(dict.fromkeys(list(columns) + ['content_hash']))
+        for attempt in range(3):
+            rows, seen = [], set()
+            try:
+                for directory in self._partitions():
+                    if wanted_days is not None and directory.split("=", 1)[1] not in wanted_days:
+                        continue
+                    for part in sorted(glob.glob(os.path.join(directory, "*.parquet")), key=os.path.getmtime):
+                        for row in pq.read_table(part, columns=read_columns).to_pylist():
+                            if row['content_hash'] not in seen:
+                                seen.add(row['content_hash'])
+                                rows.append(row)
+                return rows, seen
+            except FileNotFoundError:
+                # Another process compacted the partition mid-read - start over
+                if attempt == 2:
+                    raise
+        return [], set()
+
+    def export_csv(self, path: Optional[str] = None) -> int:
+        """Rewrite the master CSV (or path) from the archive; returns rows written"""
+        # With NEWS_MASTER_CSV=0 the archive keeps no CSV copy - export to the usual name
+        path = path or self.csv_path or MASTER_CSV
+        rows = self.read_columns(MASTER_FIELDS)
+        with open(path + ".tmp", 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=MASTER_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        os.replace(path + ".tmp", path)
+        return len(rows)
+
+    def import_csv(self, path: Optional[str] = None) -> int:
+        """Load an existing master CSV into an empty archive (first run after upgrading)"""
+        path = path or self.csv_path
+        if pq is None or self._partitions() or not path or not os.path.exists(path):
+            return 0
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            rows = [{field: row.get(field) or "" for field in MASTER_FIELDS} for row in csv.DictReader(f)]
+        with self.lock:
+            by_day: Dict[str, List[Dict]] = {}
+            for row in rows:
+                by_day.setdefault(processed_day(row), []).append(row)
+            for day, day_rows in by_day.items():
+                self._write_part(day, day_rows)
+        if rows:
+            logger.info(f"Imported {len(rows)} rows from {path} into {self.root}")
+        return len(rows)
+
+
+def archive_from_env(csv_path: str = MASTER_CSV) -> NewsArchive:
+    """The archive as the processor configures it (NEWS_ARCHIVE_DIR, NEWS_ARCHIVE_BATCH, NEWS_MASTER_CSV)"""
+    archive = NewsArchive(
+        os.getenv('NEWS_ARCHIVE_DIR', "processed_news_archive"),
+        csv_path=csv_path if os.getenv('NEWS_MASTER_CSV', '1') != '0' or not is_available() else None,
+        batch_size=int(os.getenv('NEWS_ARCHIVE_BATCH', '50'))
+    )
+    archive.import_csv(csv_path)
+    return archive
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Maintain the processed news archive")
+    parser.add_argument('command', choices=['export-csv', 'compact', 'info'])
+    parser.add_argument('--output', help="CSV path for export-csv (default: the master CSV)")
+    args = parser.parse_args()
+
+    archive = archive_from_env()
+    if args.command == 'export-csv':
+        output = args.output or archive.csv_path or MASTER_CSV
+        print(f"Wrote {archive.export_csv(output)} rows to {output}")
+    elif args.command == 'compact':
+        print(f"Compacted {archive.compact()} partition(s)")
+    else:
+        rows = archive.read_columns(['processed_date'])
+        print(f"{len(rows)} rows in {archive.root} ({'parquet' if is_available() else 'csv only'}), "
+              f"{len(archive._partitions())} day partition(s)")
+    archive.close()
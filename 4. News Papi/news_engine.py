@@ -0,0 +1,980 @@
+import csv
+import os
+import hashlib
+import pandas as pd
+from dotenv import load_dotenv
+from typing import Any, Callable, List, Dict, Optional
+import time
+import argparse
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from response_cache import ResponseCache
+from tracking_store import TrackingStore
+from near_duplicate import ClaimedFingerprints, NearDuplicateIndex
+from news_archive import archive_from_env, is_available as archive_is_columnar
+from llm_json import extract_json, validate_text_fields
+from news_stream import NewsStream
+from image_worker import ImageGenerator, POLLINATIONS_URL
+from image_cache import ImageCache
+from checkpoint_journal import CheckpointJournal, STAGES
+from stage_metrics import StageMetrics
+from headline_index import ClaimedHeadlines, HeadlineIndex, HashingTfidfEmbedder, OllamaEmbedder
+from llm_backends import BACKENDS, LLMBackend, OpenRouterBackend, create_backend
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Per-field prompts as (system message, prompt) templates, by the backend's prompt_style.
+# 'inline' is what the OpenRouter processor always sent (one user message, text appended);
+# 'editor' is the wording news_processor_local.py used with Ollama, written for small local models.
+FIELD_PROMPTS = {
+    'inline': {
+        'headline': (
+            "Rewrite this headline to make it more engaging and clickable. "
+            "Keep it concise but compelling. "
+            "Output only the headline as plain text, nothing else please! "
+            "If you put anything else my program will crash. "
+            "Just the renovated headline in plain text. This is the headline: ",
+            "{headline}"
+        ),
+        'description': (
+            "Rewrite this news description to make it more engaging and informative. "
+            "Keep the key facts but make it more compelling to read. "
+            "Make it 2-3 sentences maximum. "
+            "Output only the description as plain text, nothing else please! "
+            "Context headline: {headline}\n"
+            "Description to rewrite: ",
+            "{description}"
+        ),
+        'image_prompt': (
+            "Create a detailed image prompt for AI image generation based on this news. "
+            "The image should visually represent the story. "
+            "Do not include text in the image description. "
+            "Include Kenyan context where appropriate. "
+            "Make it engaging and relatable. "
+            "Output only the image prompt, nothing else please: ",
+            "{headline}. {description}"
+        ),
+    },
+    'editor': {
+        'headline': (
+            "You are a professional news editor. Rewrite headlines to make them more engaging and clickable. "
+            "Keep them concise but compelling. Output only the headline as plain text, nothing else. "
+            "Do not add quotes, explanations, or any other text.",
+            "Rewrite this headline: {headline}"
+        ),
+        'description': (
+            "You are a professional news editor. Rewrite news descriptions to make them more engaging and informative. "
+            "Keep the key facts but make them more compelling to read. Make it 2-3 sentences maximum. "
+            "Output only the description as plain text, nothing else. Do not add quotes or explanations.",
+            "Context headline: {headline}\n\nRewrite this description: {description}"
+        ),
+        'image_prompt': (
+            "You are an AI image prompt specialist. Create detailed image prompts for AI image generation based on news stories. "
+            "The image should visually represent the story. Do not include text in the image description. "
+            "Include Kenyan context where appropriate. Make it engaging and relatable. "
+            "Output only the image prompt, nothing else. Do not add quotes or explanations.",
+            "Create an image prompt for this news story:\n\nHeadline: {headline}\nDescription: {description}"
+        ),
+    },
+}
+
+class NewsProcessor:
+    """
+    A comprehensive news processing system that:
+    1. Reads scraped news from CSV
+    2. Checks for duplicates across all operations
+    3. Rewrites headlines AND descriptions using AI
+    4. Generates image prompts and creates actual images
+    5. Stores all processed data in a master CSV file
+    6. Talks to any text backend - OpenRouter providers, a local Ollama, or an offline stub
+    7. Optionally processes several articles at once on a bounded worker pool
+    """
+    
+    def __init__(self, backend: Optional[LLMBackend] = None):
+        # Text generation is pluggable (see llm_backends.py); everything below applies to any backend
+        self.backend = backend or OpenRouterBackend()
+        
+        # Per-stage latency / error / byte counters, written out at the end of a run
+        self.metrics = StageMetrics()
+        self.backend.metrics = self.metrics
+        
+        # Ask for headline, description and image prompt in one JSON reply
+        self.single_call_mode = os.getenv('NEWS_SINGLE_CALL', '1') != '0'
+        
+        # Serialises master CSV + tracking writes so each item lands as one unit
+        self._persist_lock = threading.Lock()
+        
+        # Identical prompts (e.g. after a crash) are answered from disk
+        self.response_cache = ResponseCache("llm_cache.sqlite")
+        
+        # File paths
+        self.input_news_file = "kenyans_news.csv"
+        self.input_stream_file = "kenyans_news.jsonl"
+        self.master_output_file = "processed_news_master.csv"  # CSV copy of the archive (see news_archive.py)
+        self.duplicate_tracking_file = "processed_tracking.csv"  # legacy format, imported once
+        self.tracking_db_file = "processed_tracking.db"
+        self.headline_index_prefix = "processed_headlines"
+        self.story_groups_file = "story_groups.csv"
+        self.metrics_file = "pipeline_metrics.json"
+        self.prometheus_file = os.getenv('NEWS_PROMETHEUS_FILE')  # e.g. .../textfile_collector/news.prom
+        self.journal_file = "processing_journal.jsonl"
+        self.images_folder = "generated_images"
+        
+        # Duplicate tracking (indexed on disk, nothing loaded up front)
+        self.tracking_store: Optional[TrackingStore] = None
+        self.near_duplicates: Optional[NearDuplicateIndex] = None
+        # SimHash distance (bits out of 64) under which two items count as the same story
+        self.near_duplicate_distance = int(os.getenv('NEWS_NEAR_DUP_DISTANCE', '3'))
+        
+        # Same event from a different outlet: 'skip' it, 'group' it with the earlier story, or 'off'
+        self.headline_index: Optional[HeadlineIndex] = None
+        self.similar_stories = os.getenv('NEWS_SIMILAR_STORIES', 'group')
+        # Cosine similarity at which two headlines count as one story (default depends on the embedder)
+        self.similarity_threshold = float(os.getenv('NEWS_SIMILARITY_THRESHOLD', '0') or 0)
+        
+        # Master rows are batched into day-partitioned Parquet files, with the CSV kept alongside
+        self.archive = archive_from_env(self.master_output_file)
+        
+        # Stages finished for items that were not written out yet (see _process_item)
+        self.journal = CheckpointJournal(self.journal_file)
+        
+        # Create images folder
+        os.makedirs(self.images_folder, exist_ok=True)
+        
+        # Images already rendered for the same prompt are reused, not downloaded again
+        self.image_cache = ImageCache(
+            os.path.join(self.images_folder, ".cache"),
+            max_bytes=int(os.getenv('NEWS_IMAGE_CACHE_MB', '500')) * 1024 * 1024
+        )
+        
+        # Images render on their own pool while text work moves on to later items
+        self.image_generator = ImageGenerator(
+            self.images_folder, max_workers=int(os.getenv('NEWS_IMAGE_WORKERS', '4')),
+            cache=self.image_cache, metrics=self.metrics,
+            base_url=os.getenv('NEWS_IMAGE_URL', POLLINATIONS_URL)
+        )
+        
+        self._load_existing_processed_data()
+        # Items persisted just before a crash may still have journal lines - drop those
+        self.journal.compact(self.tracking_store.has_content_hash if self.tracking_store else None)
+    
+    def _load_existing_processed_data(self) -> None:
+        """Open the tracking store, importing the old tracking CSV on first use"""
+        try:
+            self.tracking_store = TrackingStore(self.tracking_db_file, legacy_csv=self.duplicate_tracking_file)
+            self.near_duplicates = NearDuplicateIndex(
+                self.tracking_store,
+                max_distance=self.near_duplicate_distance,
+                bands=next(b for b in (4, 8, 16, 32, 64) if b > self.near_duplicate_distance or b == 64)
+            )
+            self.near_duplicates.backfill(
+                lambda: self.archive.read_columns(['url', 'original_headline', 'original_description']),
+                self.archive.root
+            )
+            if self.similar_stories != 'off':
+                embedder = (OllamaEmbedder(model=os.getenv('NEWS_EMBED_MODEL', 'nomic-embed-text'))
+                            if os.getenv('NEWS_EMBEDDINGS', 'tfidf') == 'ollama' else HashingTfidfEmbedder())
+                self.similarity_threshold = self.similarity_threshold or embedder.default_threshold
+                self.headline_index = HeadlineIndex(self.headline_index_prefix, embedder)
+                self.headline_index.backfill(self.tracking_store)
+            count = self.tracking_store.count()
+            if count:
+                logger.info(f"Tracking store has {count} previously processed items")
+            else:
+                logger.info("No previous processing data found - starting fresh")
+        except Exception as e:
+            logger.warning(f"Error loading existing data: {e}")
+    
+    def _generate_content_hash(self, headline: str, description: str) -> str:
+        """Generate hash for content to detect near-duplicates"""
+        try:
+            if not headline or not description:
+                logger.warning("Empty headline or description for hash generation")
+                return "unknown_" + str(int(time.time()))
+            
+            content = f"{headline.lower().strip()}{description.lower().strip()}"
+            content_hash = hashlib.md5(content.encode('utf-8')).hexdigest()
+            
+            # Ensure hash is at least 8 characters (MD5 is always 32, but being defensive)
+            if len(content_hash) < 8:
+                logger.warning(f"Generated hash is unexpectedly short: {content_hash}")
+                content_hash = (content_hash + "00000000")[:8]
+            
+            logger.debug(f"Generated content hash: '{content_hash}' for headline: '{headline[:50]}'")
+            return content_hash
+        except Exception as e:
+            logger.error(f"Error generating content hash: {e}")
+            return "error_" + str(int(time.time()))
+    
+    def _is_duplicate(self, headline: str, description: str, url: str) -> bool:
+        """Check if this news item has already been processed"""
+        try:
+            content_hash = self._generate_content_hash(headline, description)
+            
+            if self.tracking_store.has_url(url):
+                logger.info(f"Duplicate URL found: {url}")
+                return True
+            
+            if self.tracking_store.has_headline(headline):
+                logger.info(f"Duplicate headline found: {headline[:50]}...")
+                return True
+            
+            if self.tracking_store.has_content_hash(content_hash):
+                logger.info(f"Duplicate content found: {headline[:50]}...")
+                return True
+            
+            if self.near_duplicates:
+                match = self.near_duplicates.find(headline, description)
+                if match:
+                    logger.info(f"Near-duplicate of earlier item '{match['headline'][:50]}' ({match['url']}), "
+                                f"distance {match['distance']}: {headline[:50]}...")
+                    return True
+            
+            if self.headline_index is not None and self.similar_stories == 'skip':
+                match = self.headline_index.find_similar(headline, self.similarity_threshold)
+                if match:
+                    logger.info(f"Same story as earlier item '{match['headline'][:50]}' ({match['url']}), "
+                                f"similarity {match['similarity']:.2f}: {headline[:50]}...")
+                    return True
+            
+            return False
+        except Exception as e:
+            logger.error(f"Error checking for duplicates: {e}")
+            return False
+    
+    def _make_api_request(self, prompt: str, system_message: str, max_retries: int = 3,
+                          single_line: bool = False, stage: str = "text",
+                          accept: Optional[Callable[[str], bool]] = None) -> Optional[str]:
+        """
+        Answer from the response cache, or ask the backend and cache its reply.
+        With accept, only replies it approves are cached (or served from the cache),
+        so a malformed structured reply is not replayed until it expires.
+        """
+        started = time.monotonic()
+        cached = self.response_cache.get_any(self.backend.models(), system_message, prompt, accept=accept)
+        if cached is not None:
+            self.metrics.record('llm_cache', time.monotonic() - started)
+            logger.debug("Using cached API response")
+            return cached
+        
+        with self.metrics.time(stage) as timer:
+            result = self.backend.generate(prompt, system_message, max_retries=max_retries,
+                                           single_line=single_line, stage=stage)
+            timer.bytes = len((system_message + prompt).encode('utf-8'))
+            if not result or not result[0]:
+                timer.fail()
+                return None
+            timer.bytes += len(result[0].encode('utf-8'))
+        
+        content, model = result
+        if accept is None or accept(content):
+            self.response_cache.put(model, system_message, prompt, content)
+        return content
+    
+    def _field_prompt(self, field: str, **values: str):
+        """(system message, prompt) for one field, in the wording the backend is used to"""
+        prompts = FIELD_PROMPTS.get(getattr(self.backend, 'prompt_style', 'inline'), FIELD_PROMPTS['inline'])
+        system_template, prompt_template = prompts[field]
+        return system_template.format(**values), prompt_template.format(**values)
+    
+    @staticmethod
+    def _clean_field(text: Optional[str]) -> Optional[str]:
+        """Strip the quotes models like to wrap a one-field answer in"""
+        if not text:
+            return text
+        return text.strip().strip('"').strip("'").strip() or None
+    
+    def rewrite_headline(self, original_headline: str) -> Optional[str]:
+        """Rewrite headline to make it more engaging"""
+        if not original_headline or not original_headline.strip():
+            logger.warning("Empty headline provided for rewriting")
+            return None
+        
+        system_message, prompt = self._field_prompt('headline', headline=original_headline)
+        rewritten = self._clean_field(
+            self._make_api_request(prompt, system_message, single_line=True, stage='headline'))
+        if rewritten:
+            logger.info(f"Headline rewritten: {original_headline[:30]}... -> {rewritten[:30]}...")
+        return rewritten
+    
+    def rewrite_description(self, original_description: str, headline: str) -> Optional[str]:
+        """Rewrite description to make it more engaging"""
+        if not original_description or not original_description.strip():
+            logger.warning("Empty description provided for rewriting")
+            return None
+        
+        system_message, prompt = self._field_prompt('description', headline=headline or "",
+                                                    description=original_description)
+        rewritten = self._clean_field(self._make_api_request(prompt, system_message, stage='description'))
+        if rewritten:
+            logger.info(f"Description rewritten for: {headline[:30]}...")
+        return rewritten
+    
+    def generate_image_prompt(self, headline: str, description: str) -> Optional[str]:
+        """Generate image description prompt for the news"""
+        if not headline or not headline.strip():
+            logger.warning("Empty headline provided for image prompt generation")
+            return None
+        
+        system_message, prompt = self._field_prompt('image_prompt', headline=headline, description=description or "")
+        # Not single_line: models often open a detailed prompt with a lead-in line ("Here is...:")
+        image_prompt = self._clean_field(self._make_api_request(prompt, system_message, stage='image_prompt'))
+        if image_prompt:
+            logger.info(f"Image prompt generated for: {headline[:30]}...")
+        return image_prompt
+    
+    def rewrite_article(self, original_headline: str, original_description: str) -> Dict[str, str]:
+        """Rewrite headline, description and image prompt in a single structured request
+        
+        Returns only the fields that came back valid - callers fall back to the
+        per-field methods for anything missing.
+        """
+        if not original_headline or not original_headline.strip():
+            logger.warning("Empty headline provided for rewriting")
+            return {}
+        
+        system_message = (
+            "You are rewriting a Kenyan news item. Return ONE JSON object with exactly these keys: "
+            '"headline" - the headline rewritten to be more engaging and clickable, concise but compelling; '
+            '"description" - the description rewritten to be engaging and informative, keeping the key facts, '
+            "2-3 sentences maximum; "
+            '"image_prompt" - a detailed prompt for AI image generation that visually represents the story, '
+            "with no text in the image, Kenyan context where appropriate, engaging and relatable. "
+            "Output only the JSON object, no markdown, no explanations.\n"
+        )
+        prompt = f"Headline: {original_headline}\nDescription: {original_description or ''}"
+        
+        def article_fields(response: Optional[str]) -> Dict[str, str]:
+            return validate_text_fields(
+                extract_json(response),
+                ['headline', 'description', 'image_prompt'],
+                max_lengths={'headline': 300, 'description': 2000, 'image_prompt': 2000}
+            )
+        
+        response = self._make_api_request(prompt, system_message, stage='article',
+                                          accept=lambda reply: len(article_fields(reply)) == 3)
+        fields = article_fields(response)
+        
+        if len(fields) == 3:
+            logger.info(f"Article rewritten in one call: {original_headline[:30]}... -> {fields['headline'][:30]}...")
+        else:
+            logger.warning(f"Structured rewrite incomplete for {original_headline[:30]}... "
+                           f"(got {sorted(fields)}), falling back to per-field calls")
+        return fields
+    
+    def rewrite_articles_batch(self, items: List[Dict[str, str]], retry_failed: bool = True) -> List[Dict[str, str]]:
+        """Rewrite several articles in one request (numbered list in, JSON array out)
+        
+        Returns one dict per input item, in order; items the model skipped or
+        mangled come back empty (after one re-request of just those items).
+        """
+        results: List[Dict[str, str]] = [{} for _ in items]
+        if not items:
+            return results
+        
+        system_message = (
+            "You are rewriting a numbered list of Kenyan news items. For EVERY item return an object with keys: "
+            '"id" - the item number; '
+            '"headline" - the headline rewritten to be more engaging and clickable, concise but compelling; '
+            '"description" - the description rewritten to be engaging and informative, keeping the key facts, '
+            "2-3 sentences maximum; "
+            '"image_prompt" - a detailed prompt for AI image generation that visually represents the story, '
+            "with no text in the image, Kenyan context where appropriate, engaging and relatable. "
+            "Output only a JSON array of these objects, no markdown, no explanations.\n"
+        )
+        prompt = "\n\n".join(
+            f"{number}. Headline: {item['headline']}\n   Description: {item['description']}"
+            for number, item in enumerate(items, 1)
+        )
+        
+        def batch_fields(response: Optional[str]) -> List[Dict[str, str]]:
+            parsed = extract_json(response, expect='array')
+            fields_by_item: List[Dict[str, str]] = [{} for _ in items]
+            for entry in parsed if isinstance(parsed, list) else []:
+                if not isinstance(entry, dict):
+                    continue
+                try:
+                    position = int(entry.get('id')) - 1
+                except (TypeError, ValueError):
+                    continue
+                if 0 <= position < len(items) and not fields_by_item[position]:
+                    fields = validate_text_fields(
+                        entry,
+                        ['headline', 'description', 'image_prompt'],
+                        max_lengths={'headline': 300, 'description': 2000, 'image_prompt': 2000}
+                    )
+                    if len(fields) == 3:
+                        fields_by_item[position] = fields
+            return fields_by_item
+        
+        # Only a reply that covers every item is worth replaying from the cache
+        response = self._make_api_request(prompt, system_message, stage='batch',
+                                          accept=lambda reply: all(batch_fields(reply)))
+        results = batch_fields(response)
+        
+        failed = [position for position, fields in enumerate(results) if not fields]
+        logger.info(f"Batch rewrite: {len(items) - len(failed)}/{len(items)} items parsed")
+        
+        # Re-request only the items that did not come back cleanly
+        if failed and retry_failed and len(failed) < len(items) and len(failed) > 1:
+            retried = self.rewrite_articles_batch([items[position] for position in failed], retry_failed=False)
+            for position, fields in zip(failed, retried):
+                results[position] = fields
+        
+        return results
+    
+    def create_image(self, prompt: str, filename: str) -> Optional[str]:
+        """Create image from prompt and save to file"""
+        # Defensive checks
+        if not prompt or not prompt.strip():
+            logger.error("Image prompt is empty!")
+            return None
+        if not filename or not filename.strip():
+            logger.error("Image filename is empty!")
+            return None
+        if not self.images_folder:
+            logger.error("Images folder not set!")
+            return None
+        
+        return self.image_generator.generate(prompt, filename)
+    
+    def _save_to_archive(self, data: Dict) -> None:
+        """Add the processed row to the archive (written out in batches)"""
+        try:
+            self.archive.append(data)
+        except Exception as e:
+            logger.error(f"Error saving to the news archive: {e}")
+    
+    def _save_tracking_data(self, headline: str, description: str, url: str) -> None:
+        """Save tracking data to prevent duplicates"""
+        try:
+            content_hash = self._generate_content_hash(headline, description)
+            item_id = self.tracking_store.add(headline, url, content_hash, pd.Timestamp.now().isoformat())
+            if self.near_duplicates:
+                self.near_duplicates.add(item_id, headline, description)
+            if self.headline_index is not None:
+                if self.similar_stories == 'group':
+                    self._save_story_group(headline, url)
+                self.headline_index.add(item_id, headline, url)
+            
+        except Exception as e:
+            logger.error(f"Error saving tracking data: {e}")
+    
+    def _save_story_group(self, headline: str, url: str) -> None:
+        """Link an item to the earlier story it most resembles, in story_groups.csv"""
+        match = self.headline_index.find_similar(headline, self.similarity_threshold)
+        if not match:
+            return
+        
+        file_exists = os.path.exists(self.story_groups_file)
+        with open(self.story_groups_file, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=['url', 'headline', 'related_url', 'related_headline', 'similarity'])
+            if not file_exists:
+                writer.writeheader()
+            writer.writerow({
+                'url': url,
+                'headline': headline,
+                'related_url': match['url'],
+                'related_headline': match['headline'],
+                'similarity': round(match['similarity'], 3)
+            })
+        logger.info(f"Grouped with earlier story '{match['headline'][:50]}' (similarity {match['similarity']:.2f})")
+    
+    def load_news_data(self) -> List[Dict[str, str]]:
+        """Load news data from CSV file"""
+        news_items = []
+        
+        try:
+            if not os.path.exists(self.input_news_file):
+                logger.error(f"Input file {self.input_news_file} not found!")
+                return news_items
+            
+            with open(self.input_news_file, 'r', newline='', encoding='utf-8') as f:
+                reader = csv.DictReader(f)
+                for row in reader:
+                    if 'headline' in row and 'description' in row and 'url' in row:
+                        headline = str(row['headline']).strip() if row['headline'] else ""
+                        description = str(row['description']).strip() if row['description'] else ""
+                        url = str(row['url']).strip() if row['url'] else ""
+                        
+                        if headline and description and url:
+                            news_items.append({
+                                'headline': headline,
+                                'description': description,
+                                'url': url
+                            })
+            
+            logger.info(f"Loaded {len(news_items)} news items from {self.input_news_file}")
+            return news_items
+            
+        except Exception as e:
+            logger.error(f"Error loading news data: {e}")
+            return news_items
+    
+    @staticmethod
+    def _image_ready(master_data: Dict) -> bool:
+        """True once the row's image is no longer rendering (a plain path counts as ready)"""
+        image_filepath = master_data['image_filepath']
+        return not isinstance(image_filepath, Future) or image_filepath.done()
+    
+    def _persist_item(self, master_data: Dict) -> None:
+        """Write the master row and tracking row for one item together"""
+        # The image may still be rendering on the image pool - wait for it here
+        if isinstance(master_data['image_filepath'], Future):
+            with self.metrics.time('image_wait'):
+                image_filepath = master_data['image_filepath'].result()
+            if not image_filepath:
+                logger.warning(f"Failed to create image for: {master_data['original_headline'][:50]}...")
+                image_filepath = "image_generation_failed"
+            master_data['image_filepath'] = image_filepath
+        
+        with self._persist_lock, self.metrics.time('persist'):
+            self._save_to_archive(master_data)
+            self._save_tracking_data(
+                master_data['original_headline'],
+                master_data['original_description'],
+                master_data['url']
+            )
+            self.journal.finish(master_data['content_hash'])
+    
+    def _process_item(self, index: int, total: int, item: Dict[str, str],
+                      batched: Optional[Dict[str, str]] = None) -> Optional[Dict]:
+        """Run the full rewrite + image pipeline for one item, return its master CSV row"""
+        headline = item['headline']
+        description = item['description']
+        url = item['url']
+        
+        logger.info(f"Processing item {index}/{total}: {headline[:50]}...")
+        
+        try:
+            content_hash = self._generate_content_hash(headline, description)
+            if not content_hash or len(content_hash) < 8:
+                logger.error(f"Generated content hash is too short: '{content_hash}' for headline '{headline}'")
+                content_hash = (content_hash + "00000000")[:8]
+            
+            # Stages an interrupted earlier run already finished are taken from the journal
+            done = self.journal.stages(content_hash)
+            if done:
+                logger.info(f"Resuming item {index} after: {', '.join(stage for stage in STAGES if stage in done)}")
+            
+            # One structured call for all three fields; anything missing is redone per field
+            if not batched and self.single_call_mode and not all(stage in done for stage in STAGES[:3]):
+                batched = self.rewrite_article(headline, description)
+            batched = {**(batched or {}), **done}
+            
+            # Rewrite headline
+            rewritten_headline = batched.get('headline') or self.rewrite_headline(headline)
+            self.journal.record(content_hash, 'headline', rewritten_headline)
+            if not rewritten_headline:
+                logger.warning(f"Failed to rewrite headline: {headline[:50]}...")
+                rewritten_headline = headline
+            
+            # Rewrite description
+            rewritten_description = batched.get('description') or self.rewrite_description(description, headline)
+            self.journal.record(content_hash, 'description', rewritten_description)
+            if not rewritten_description:
+                logger.warning(f"Failed to rewrite description for: {headline[:50]}...")
+                rewritten_description = description
+            
+            # Generate image prompt
+            image_prompt = batched.get('image_prompt') or self.generate_image_prompt(rewritten_headline, rewritten_description)
+            self.journal.record(content_hash, 'image_prompt', image_prompt)
+            if not image_prompt:
+                logger.warning(f"Failed to generate image prompt for: {headline[:50]}...")
+                image_prompt = f"A visual representation of: {rewritten_headline}"
+            
+            # Create image with defensive checks
+            image_filename = f"news_{content_hash[:8]}"
+            
+            # Additional defensive checks
+            if not image_prompt or not image_prompt.strip():
+                logger.warning(f"Image prompt is empty for: {headline[:50]}...")
+                image_prompt = f"A visual representation of: {rewritten_headline}"
+            
+            if not image_filename or not image_filename.strip():
+                logger.error(f"Image filename is empty for: {headline[:50]}...")
+                image_filename = "news_unknown"
+            
+            logger.debug(f"Queueing image with prompt: '{image_prompt[:60]}...', filename: '{image_filename}'")
+            
+            if batched.get('image') and os.path.exists(batched['image']):
+                # Already rendered before the restart - hand it on resolved, like a finished download
+                image_filepath = Future()
+                image_filepath.set_result(batched['image'])
+            else:
+                # Resolved in _persist_item, so this worker can start on the next article now
+                image_filepath = self.image_generator.submit(image_prompt, image_filename)
+                image_filepath.add_done_callback(
+                    lambda future: self.journal.record(content_hash, 'image', future.result())
+                )
+            
+            # Prepare data for master CSV
+            return {
+                'original_headline': headline,
+                'rewritten_headline': rewritten_headline,
+                'original_description': description,
+                'rewritten_description': rewritten_description,
+                'image_prompt': image_prompt,
+                'image_filepath': image_filepath,
+                'url': url,
+                'content_hash': content_hash,
+                'processed_date': pd.Timestamp.now().isoformat()
+            }
+            
+        except Exception as e:
+            logger.error(f"Error processing item {index}: {e}. Headline: '{headline}', Description: '{description[:100]}...', URL: '{url}'")
+            return None
+    
+    def _process_chunk(self, chunk: List[tuple], total: int) -> List[tuple]:
+        """Process a chunk of (index, item) pairs, sharing one batch rewrite when it has several"""
+        rewrites: List[Dict[str, str]] = [{} for _ in chunk]
+        # Items whose text stages are all in the journal already need no rewrite
+        to_rewrite = [
+            position for position, (_, item) in enumerate(chunk)
+            if not all(stage in self.journal.stages(self._generate_content_hash(item['headline'], item['description']))
+                       for stage in STAGES[:3])
+        ]
+        if len(to_rewrite) > 1:
+            batch = self.rewrite_articles_batch([chunk[position][1] for position in to_rewrite])
+            for position, rewrite in zip(to_rewrite, batch):
+                rewrites[position] = rewrite
+        
+        return [
+            (index, self._process_item(index, total, item, rewrites[position]))
+            for position, (index, item) in enumerate(chunk)
+        ]
+    
+    def _new_claims(self) -> Dict[str, Any]:
+        """What this run has claimed so far - items are only in the tracking store once saved"""
+        return {
+            'urls': set(),
+            'headlines': set(),
+            'hashes': set(),
+            'fingerprints': ClaimedFingerprints(self.near_duplicates) if self.near_duplicates else None,
+            'stories': (ClaimedHeadlines(self.headline_index)
+                        if self.headline_index is not None and self.similar_stories == 'skip' else None)
+        }
+    
+    def _claim_new_item(self, index: int, item: Dict[str, str], claimed: Dict[str, Any]) -> Optional[Dict[str, str]]:
+        """Clean an input item and return it if it is new (not processed, not already claimed this run)"""
+        headline = str(item.get('headline') or '').strip()
+        description = str(item.get('description') or '').strip()
+        url = str(item.get('url') or '').strip()
+        
+        if not headline or not description or not url:
+            logger.error(f"Skipping item {index} due to missing headline/description/url.")
+            return None
+        
+        content_hash = self._generate_content_hash(headline, description)
+        with self.metrics.time('dedup'):
+            duplicate = self._is_duplicate(headline, description, url)
+        if (duplicate or url in claimed['urls']
+                or headline in claimed['headlines'] or content_hash in claimed['hashes']):
+            logger.info(f"Skipping duplicate item: {headline[:50]}...")
+            return None
+        
+        if claimed['fingerprints'] is not None:
+            match = claimed['fingerprints'].claim(headline, description, url)
+            if match:
+                logger.info(f"Near-duplicate of '{match['headline'][:50]}' ({match['url']}) from this run, "
+                            f"distance {match['distance']}: {headline[:50]}...")
+                return None
+        if claimed['stories'] is not None:
+            match = claimed['stories'].claim(headline, url, self.similarity_threshold)
+            if match:
+                logger.info(f"Same story as '{match['headline'][:50]}' ({match['url']}) from this run, "
+                            f"similarity {match['similarity']:.2f}: {headline[:50]}...")
+                return None
+        
+        claimed['urls'].add(url)
+        claimed['headlines'].add(headline)
+        claimed['hashes'].add(content_hash)
+        return {'headline': headline, 'description': description, 'url': url}
+    
+    def close(self) -> None:
+        """End of the processor's life: stop the image pool and write out the last archive batch"""
+        self.image_generator.shutdown()
+        self.archive.close()
+    
+    def _write_metrics(self) -> None:
+        """Print the per-stage table and export it as JSON (and a Prometheus textfile if configured)"""
+        try:
+            extra = {
+                'backend': self.backend.name,
+                'response_cache': self.response_cache.stats(),
+                'image_cache': self.image_cache.stats()
+            }
+            providers = self.backend.provider_health()
+            if providers is not None:
+                extra['providers'] = providers
+            self.metrics.write_json(self.metrics_file, extra=extra)
+            if self.prometheus_file:
+                self.metrics.write_prometheus(self.prometheus_file)
+        except OSError as e:
+            logger.error(f"Error writing metrics: {e}")
+        print(self.metrics.format_table())
+    
+    def _image_cache_line(self) -> str:
+        stats = self.image_cache.stats()
+        return (f"{stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%}), "
+                f"{stats['entries']} cached ({stats['bytes'] / 1024 / 1024:.1f} MB), "
+                f"{stats['evictions']} evicted")
+    
+    def process_all_news(self, delay_between_requests: float = 0.0, max_workers: int = 1,
+                         batch_size: int = 1) -> None:
+        """Process all news items - rewrite headlines, descriptions, and create images
+        
+        API pacing comes from each provider's token bucket (see rate_limiter.py);
+        delay_between_requests is only an optional extra pause between items.
+        With max_workers > 1 several items run at once, and with batch_size > 1 each
+        request rewrites that many articles together. Rows are still written in
+        input order, one item (master + tracking) at a time.
+        """
+        with self.metrics.time('load') as timer:
+            news_items = self.load_news_data()
+            if os.path.exists(self.input_news_file):
+                timer.bytes = os.path.getsize(self.input_news_file)
+        
+        if not news_items:
+            logger.error("No news items to process!")
+            return
+        
+        if not self.backend.is_ready():
+            logger.error(f"The {self.backend.name} backend is not configured (no API keys / models)")
+            return
+        
+        logger.info(f"Starting to process {len(news_items)} news items...")
+        logger.info(f"Using backend {self.backend.describe()}")
+        
+        # Duplicate checks happen up front so two workers never pick up the same story
+        pending = []
+        claimed = self._new_claims()
+        
+        for index, item in enumerate(news_items, 1):
+            new_item = self._claim_new_item(index, item, claimed)
+            if new_item:
+                pending.append((index, new_item))
+        
+        new_items_count = len(pending)
+        processed_count = 0
+        
+        batch_size = max(1, batch_size)
+        chunks = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+        
+        if max_workers <= 1:
+            # Rows wait here while their images render; text work carries on meanwhile
+            awaiting_images = deque()
+            for chunk in chunks:
+                awaiting_images.extend(
+                    result for result in self._process_chunk(chunk, len(news_items)) if result[1]
+                )
+                
+                while awaiting_images and (self._image_ready(awaiting_images[0][1])
+                                           or len(awaiting_images) > self.image_generator.max_workers):
+                    index, master_data = awaiting_images.popleft()
+                    self._persist_item(master_data)
+                    processed_count += 1
+                    logger.info(f"✓ Successfully processed item {index}")
+                
+                if delay_between_requests > 0:
+                    with self.metrics.time('sleep'):
+                        time.sleep(delay_between_requests)
+            
+            while awaiting_images:
+                index, master_data = awaiting_images.popleft()
+                self._persist_item(master_data)
+                processed_count += 1
+                logger.info(f"✓ Successfully processed item {index}")
+        else:
+            logger.info(f"Processing {new_items_count} new items with {max_workers} workers")
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(self._process_chunk, chunk, len(news_items)) for chunk in chunks]
+                
+                # Collect in submission order so output files stay deterministic
+                for future in futures:
+                    for index, master_data in future.result():
+                        if master_data:
+                            self._persist_item(master_data)
+                            processed_count += 1
+                            logger.info(f"✓ Successfully processed item {index}")
+        
+        self.archive.flush()
+        
+        # Print summary
+        print(f"\n{'='*60}")
+        print(f"NEWS PROCESSING COMPLETED")
+        print(f"{'='*60}")
+        print(f"Total items found: {len(news_items)}")
+        print(f"New items processed: {new_items_count}")
+        print(f"Successfully processed: {processed_count}")
+        print(f"Duplicates skipped: {len(news_items) - new_items_count}")
+        print(f"Image cache: {self._image_cache_line()}")
+        for line in self.backend.stats_lines():
+            print(f"Backend {line}")
+        print(f"{'='*60}")
+        self._write_metrics()
+        print(f"{'='*60}")
+        print(f"Output files:")
+        print(f"- Archive: {self.archive.root} ({'parquet' if archive_is_columnar() else 'csv only'})")
+        if self.archive.csv_path:
+            print(f"- Master CSV: {self.archive.csv_path}")
+        print(f"- Images folder: {self.images_folder}")
+        print(f"- Tracking data: {self.tracking_db_file}")
+        print(f"- Stage metrics: {self.metrics_file}")
+        print(f"{'='*60}")
+
+    def process_stream(self, max_workers: int = 1, poll_interval: float = 1.0,
+                       idle_timeout: Optional[float] = None) -> None:
+        """Process items as the scraper appends them to the JSONL stream
+        
+        Items are handed to the worker pool the moment they arrive and persisted
+        in arrival order; the stream offset is committed only after an item is
+        written (or skipped), so a restart picks up exactly where this run stopped.
+        Finished items are also saved while the stream is quiet. Stops at the
+        scraper's end marker, or after idle_timeout seconds of silence.
+        """
+        if not self.backend.is_ready():
+            logger.error(f"The {self.backend.name} backend is not configured (no API keys / models)")
+            return
+        
+        stream = NewsStream(self.input_stream_file)
+        claimed = self._new_claims()
+        in_flight = deque()  # (index, stream offset, future or None for skipped items)
+        counts = {'seen': 0, 'new': 0, 'processed': 0}
+        
+        logger.info(f"Following {self.input_stream_file} with {max_workers} worker(s)...")
+        
+        def persist_ready(wait_for_head: bool) -> None:
+            # Write finished items in arrival order, committing the offset after each
+            while in_flight:
+                index, offset, future = in_flight[0]
+                if future is not None and not (wait_for_head or future.done()):
+                    return
+                in_flight.popleft()
+                wait_for_head = False
+                master_data = future.result() if future is not None else None
+                if master_data:
+                    self._persist_item(master_data)
+                    counts['processed'] += 1
+                    logger.info(f"✓ Successfully processed streamed item {index}")
+                stream.commit(offset)
+            # Nothing in flight: write out the partial batch so readers see it now
+            if not in_flight:
+                self.archive.flush()
+        
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            for record, offset in stream.follow(poll_interval=poll_interval, idle_timeout=idle_timeout,
+                                                heartbeat=True):
+                if record is None:
+                    # The scraper is quiet - save whatever has finished meanwhile
+                    persist_ready(wait_for_head=False)
+                    continue
+                counts['seen'] += 1
+                index = counts['seen']
+                item = self._claim_new_item(index, record, claimed)
+                future = None
+                if item:
+                    counts['new'] += 1
+                    future = executor.submit(self._process_item, index, index, item)
+                in_flight.append((index, offset, future))
+                
+                persist_ready(wait_for_head=False)
+                # Keep the backlog bounded while the scraper races ahead
+                while len(in_flight) > max(1, max_workers) * 2:
+                    persist_ready(wait_for_head=True)
+            
+            while in_flight:
+                persist_ready(wait_for_head=True)
+        
+        self.archive.flush()
+        if stream.end_offset is not None:
+            stream.commit(stream.end_offset)
+        
+        print(f"\n{'='*60}")
+        print(f"STREAM PROCESSING COMPLETED")
+        print(f"{'='*60}")
+        print(f"Streamed items seen: {counts['seen']}")
+        print(f"New items processed: {counts['new']}")
+        print(f"Successfully processed: {counts['processed']}")
+        print(f"Image cache: {self._image_cache_line()}")
+        for line in self.backend.stats_lines():
+            print(f"Backend {line}")
+        print(f"{'='*60}")
+        self._write_metrics()
+        print(f"{'='*60}")
+
+def main(default_backend: str = 'openrouter'):
+    """Main function to run the news processor"""
+    parser = argparse.ArgumentParser(description="Rewrite scraped news and illustrate it")
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default=os.getenv('NEWS_BACKEND', default_backend),
+                        help="text generation backend (default: %(default)s)")
+    parser.add_argument('--model', help="model to use where the backend has a choice (ollama, stub)")
+    parser.add_argument('--stream', action='store_true',
+                        help="follow the scraper's live JSONL output instead of the finished CSV")
+    parser.add_argument('--workers', type=int, default=int(os.getenv('NEWS_WORKERS', '0')),
+                        help="items processed at once (default: the backend's parallel slots, else 1)")
+    parser.add_argument('--batch-size', type=int, default=int(os.getenv('NEWS_BATCH_SIZE', '1')))
+    parser.add_argument('--delay', type=float, default=0.0, help="extra pause between items, in seconds")
+    parser.add_argument('--idle-timeout', type=float,
+                        default=float(os.getenv('NEWS_STREAM_IDLE_TIMEOUT', '0')) or None,
+                        help="with --stream, stop after this many seconds without new records "
+                             "(default: wait for the scraper's end marker)")
+    args = parser.parse_args()
+    
+    print(f"Starting Enhanced News Processing System ({args.backend})...")
+    print("-" * 50)
+    
+    try:
+        backend = create_backend(args.backend, args.model)
+    except Exception as e:
+        logger.error(f"Failed to start the {args.backend} backend: {e}")
+        if args.backend == 'ollama':
+            print("\nTroubleshooting:")
+            print("1. Make sure Ollama is installed and running: ollama serve")
+            print("2. Pull a model if you haven't: ollama pull llama3")
+            print("3. Check if Ollama is accessible at http://localhost:11434")
+        return
+    
+    # Check if API keys are available
+    if not backend.is_ready():
+        logger.error("No API keys found in environment variables!")
+        print("Please set one or more of these API keys in your .env file:")
+        print("- API_KEY_1")
+        print("- API_KEY_2") 
+        print("- API_KEY_3")
+        print("- API_KEY_4")
+        print("- API_KEY_5")
+        return
+    
+    print(f"Using {backend.describe()}")
+    
+    # A local server with several slots is only kept busy by as many workers
+    workers = args.workers or backend.parallel_slots() or 1
+    
+    # Initialize processor
+    processor = NewsProcessor(backend)
+    
+    try:
+        # Follow the scraper's live output instead of waiting for the finished CSV
+        if args.stream:
+            processor.process_stream(max_workers=workers, idle_timeout=args.idle_timeout)
+            return
+        
+        # Process all news
+        processor.process_all_news(
+            delay_between_requests=args.delay,
+            max_workers=workers,
+            batch_size=args.batch_size
+        )
+    finally:
+        processor.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import os
+import json
+import time
+import logging
+from typing import Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+END_EVENT = 'end'
+
+
+class NewsStream:
+    """
+    Append-only JSONL handoff between the scraper and the processor.
+    The scraper appends one {headline, description, url} record per line as it
+    goes and an {"event": "end"} marker when the scrape finishes; the processor
+    follows the file and remembers how far it got in a byte-offset file.
+    """
+
+    def __init__(self, path: str = "kenyans_news.jsonl", offset_path: Optional[str] = None):
+        self.path = path
+        self.offset_path = offset_path or path + ".offset"
+        self.end_offset: Optional[int] = None
+
+    # --- producer side -------------------------------------------------
+
+    def append(self, record: Dict) -> None:
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        # One write per complete line so a reader never sees half a record as complete
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line)
+            f.flush()
+
+    def mark_end(self) -> None:
+        self.append({'event': END_EVENT})
+
+    # --- consumer side -------------------------------------------------
+
+    def committed_offset(self) -> int:
+        try:
+            with open(self.offset_path, 'r', encoding='utf-8') as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def commit(self, offset: int) -> None:
+        """Record that everything before 'offset' has been fully handled"""
+        temp_path = self.offset_path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(str(offset))
+        os.replace(temp_path, self.offset_path)
+
+    def follow(self, poll_interval: float = 1.0, idle_timeout: Optional[float] = None,
+               stop_at_end: bool = True, heartbeat: bool = False) -> Iterator[Tuple[Optional[Dict], int]]:
+        """
+        Yield (record, end_offset) for each new record, waiting for more as the file grows.
+        Stops at an end marker (if stop_at_end) or after idle_timeout seconds with no new
+        data. Pass end_offset to commit() once the record has been persisted; after an
+        end marker, self.end_offset holds the offset just past it.
+        With heartbeat, (None, offset) is also yielded after every poll that found nothing,
+        so the consumer can finish pending work while the producer is quiet.
+        """
+        self.end_offset = None
+        offset = self.committed_offset()
+        if os.path.exists(self.path) and offset > os.path.getsize(self.path):
+            logger.warning(f"{self.path} is shorter than the saved offset - starting from the top")
+            offset = 0
+
+        last_data = time.monotonic()
+        while True:
+            got_data = False
+            if os.path.exists(self.path):
+                with open(self.path, 'rb') as f:
+                    f.seek(offset)
+                    while True:
+                        line = f.readline()
+                        if not line or not line.endswith(b"\n"):
+                            break  # partial line - the writer has not finished it yet
+                        offset += len(line)
+                        got_data = True
+
+                        try:
+                            record = json.loads(line.decode('utf-8'))
+                        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+                            logger.warning(f"Skipping unreadable stream line: {e}")
+                            continue
+
+                        if record.get('event') == END_EVENT:
+                            # The consumer commits this once everything before it is persisted
+                            self.end_offset = offset
+                            if stop_at_end:
+                                return
+                            continue
+                        yield record, offset
+
+            if got_data:
+                last_data = time.monotonic()
+            elif idle_timeout is not None and time.monotonic() - last_data > idle_timeout:
+                logger.info(f"No new records for {idle_timeout}s - stopping")
+                return
+            elif heartbeat:
+                yield None, offset
+            time.sleep(poll_interval)
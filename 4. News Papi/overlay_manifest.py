@@ -0,0 +1,95 @@
+import os
+import json
+import hashlib
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bump when the drawing code changes, so every overlay is rendered again once
+LAYOUT_VERSION = 2
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_signature(path: str) -> Optional[list]:
+    """(size, mtime) - cheap to read, and changes whenever the file is rewritten"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class OverlayManifest:
+    """
+    JSON manifest of rendered overlays, {output path: entry}, where each entry keeps
+    the hash of everything that went into the output: source image bytes, headline,
+    font file and render settings. A rerun renders only rows whose hash changed or
+    whose output is missing.
+
+    Source images are hashed once; later runs reuse the stored hash while the
+    file's size and mtime are unchanged, so checking an unchanged archive costs
+    one stat() per row rather than reading every image.
+    """
+
+    def __init__(self, path: str, settings: Dict):
+        self.path = path
+        font_path = settings.get('font_path', '')
+        self.settings = json.dumps(
+            dict(settings, layout_version=LAYOUT_VERSION, font=file_signature(font_path)),
+            sort_keys=True
+        )
+        self.entries: Dict[str, Dict] = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (ValueError, OSError) as e:
+            logger.warning(f"Could not read {self.path}, rendering every overlay again: {e}")
+            return {}
+
+    def save(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f)
+        os.replace(temp_path, self.path)
+
+    def render_key(self, source_path: str, headline: str, output_path: str) -> Optional[Dict]:
+        """The entry this output would get if rendered now (None if the source is unreadable)"""
+        signature = file_signature(source_path)
+        if signature is None:
+            return None
+        entry = self.entries.get(output_path)
+        if entry and entry.get('source') == source_path and entry.get('source_signature') == signature:
+            source_hash = entry['source_hash']
+        else:
+            source_hash = file_digest(source_path)
+        key = hashlib.blake2b(
+            "\0".join((source_hash, headline, self.settings)).encode('utf-8'), digest_size=16
+        ).hexdigest()
+        return {
+            'source': source_path,
+            'source_signature': signature,
+            'source_hash': source_hash,
+            'key': key
+        }
+
+    def is_current(self, output_path: str, candidate: Dict) -> bool:
+        entry = self.entries.get(output_path)
+        return bool(entry) and entry.get('key') == candidate['key'] and os.path.exists(output_path)
+
+    def record(self, output_path: str, candidate: Dict) -> None:
+        self.entries[output_path] = candidate
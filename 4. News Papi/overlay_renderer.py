@@ -0,0 +1,177 @@
+"""
+Batch headline overlays: a dark band along the bottom of each image with the
+headline in it, for whole CSVs at a time.
+
+Headlines are wrapped over up to --max-lines lines at the largest size that
+fits (see text_layout.py), fonts and glyph widths are cached per process, and
+images are rendered on a process pool (Pillow's text drawing holds the GIL, so
+threads would not help). With a manifest, rows whose source image, headline,
+font and settings are unchanged since the last run are not rendered again.
+Output format is configurable:
+
+    png   optimized PNG (lossless, smallest PNG Pillow can make)
+    webp  WebP at --quality (much smaller, what the web front end wants)
+    jpeg  JPEG at --quality
+    same  whatever format the source image had
+
+Used by watermark-remover.py and "9. Headline Writer/try.py".
+"""
+import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from PIL import Image, ImageDraw
+
+from overlay_manifest import OverlayManifest
+from text_layout import fit_text, load_font
+
+FORMATS = {
+    'png': ('PNG', '.png'),
+    'webp': ('WEBP', '.webp'),
+    'jpeg': ('JPEG', '.jpg'),
+    'same': (None, None),
+}
+
+class OverlayJob(NamedTuple):
+    input_path: str
+    headline: str
+    output_path: str
+
+
+class RenderResult(NamedTuple):
+    done: List[OverlayJob]
+    failed: List[Tuple[OverlayJob, str]]
+    skipped: List[OverlayJob]  # output already up to date (see overlay_manifest.py)
+
+
+def output_path_for(path: str, output_format: str) -> str:
+    extension = FORMATS[output_format][1]
+    return os.path.splitext(path)[0] + extension if extension else path
+
+
+def save_image(img: Image.Image, path: str, output_format: str = 'png', quality: int = 85) -> None:
+    pil_format = FORMATS[output_format][0] or img.format or 'PNG'
+    if pil_format not in ('PNG', 'WEBP') and img.mode != 'RGB':
+        img = img.convert('RGB')  # JPEG, BMP etc. have no alpha channel
+    options = {
+        'PNG': {'optimize': True},
+        'WEBP': {'quality': quality, 'method': 4},
+        'JPEG': {'quality': quality, 'optimize': True, 'progressive': True},
+    }.get(pil_format, {})
+    img.save(path, pil_format, **options)
+
+
+def add_text_to_image(image_path: str, text: str, output_path: str, font_path: str = "Rye-Regular.ttf",
+                      output_format: str = 'png', quality: int = 85, max_lines: int = 3) -> None:
+    with Image.open(image_path) as source:
+        source_format = source.format
+        img = source.convert('RGBA')
+    width, height = img.size
+
+    # Wrap within 95% of the width and at most a third of the height
+    layout = fit_text(text, font_path, width * 0.95, height / 3, max_lines=max_lines)
+    font = load_font(font_path, layout.size)
+
+    # Text block sits at bottom center, 20 pixels from the bottom
+    top = height - layout.height - 20
+
+    # Semi-transparent black band behind the text for readability
+    band = Image.new('RGBA', img.size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(band)
+    draw.rectangle([(0, top - 10), (width, height - 10)], fill=(0, 0, 0, 180))
+    for number, (line, line_width) in enumerate(zip(layout.lines, layout.line_widths)):
+        y = top + number * (layout.line_height + layout.line_spacing)
+        draw.text(((width - line_width) / 2, y), line, font=font, fill=(255, 255, 255, 255))
+    img = Image.alpha_composite(img, band)
+
+    img.format = source_format  # for output_format 'same'
+    save_image(img, output_path, output_format, quality)
+
+
+def _render(job: OverlayJob, font_path: str, output_format: str, quality: int,
+            max_lines: int) -> Tuple[OverlayJob, Optional[str]]:
+    """Worker entry point: (job, None) on success, (job, error message) otherwise"""
+    try:
+        directory = os.path.dirname(job.output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        add_text_to_image(job.input_path, job.headline, job.output_path, font_path, output_format, quality, max_lines)
+        return job, None
+    except Exception as e:
+        return job, str(e)
+
+
+class OverlayRenderer:
+    """Renders many overlays at once on a process pool, skipping unchanged ones when given a manifest"""
+
+    def __init__(self, font_path: str = "Rye-Regular.ttf", output_format: str = 'png',
+                 quality: int = 85, workers: Optional[int] = None, max_lines: int = 3,
+                 manifest_path: Optional[str] = None, force: bool = False):
+        if output_format not in FORMATS:
+            raise ValueError(f"Unknown output format '{output_format}' - choose from {sorted(FORMATS)}")
+        self.font_path = font_path
+        self.output_format = output_format
+        self.quality = quality
+        self.max_lines = max_lines
+        self.workers = workers or os.cpu_count() or 1
+        self.force = force  # render everything, but still refresh the manifest
+        self.manifest = OverlayManifest(manifest_path, {
+            'font_path': font_path, 'output_format': output_format, 'quality': quality, 'max_lines': max_lines
+        }) if manifest_path else None
+
+    def job(self, input_path: str, headline: str, output_path: str) -> OverlayJob:
+        return OverlayJob(input_path, headline, output_path_for(output_path, self.output_format))
+
+    def render(self, jobs: Iterable[OverlayJob]) -> RenderResult:
+        """Render every job that needs it; lists keep input order"""
+        jobs = list(jobs)
+        pending, skipped, candidates = [], [], {}
+        for job in jobs:
+            candidate = self.manifest.render_key(*job) if self.manifest else None
+            if candidate and not self.force and self.manifest.is_current(job.output_path, candidate):
+                skipped.append(job)
+            else:
+                pending.append(job)
+            if candidate:
+                candidates[job.output_path] = candidate
+
+        options = (self.font_path, self.output_format, self.quality, self.max_lines)
+        if self.workers <= 1 or len(pending) <= 1:
+            results = [_render(job, *options) for job in pending]
+        else:
+            # Big chunks keep inter-process overhead small next to the rendering itself
+            chunk_size = max(1, len(pending) // (self.workers * 4))
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(pending))) as pool:
+                results = list(pool.map(_render, pending, *[[value] * len(pending) for value in options],
+                                        chunksize=chunk_size))
+
+        done = [job for job, error in results if error is None]
+        failed = [(job, error) for job, error in results if error is not None]
+
+        if self.manifest:
+            # Skipped rows too: a touched but unchanged source gets its new mtime stored
+            changed = False
+            for job in skipped + done:
+                candidate = candidates.get(job.output_path)
+                if candidate and self.manifest.entries.get(job.output_path) != candidate:
+                    self.manifest.record(job.output_path, candidate)
+                    changed = True
+            if changed:
+                self.manifest.save()
+        return RenderResult(done, failed, skipped)
+
+
+def add_arguments(parser: argparse.ArgumentParser, font_path: str) -> None:
+    """Options shared by the overlay scripts"""
+    parser.add_argument('--font', default=font_path, help="TrueType font for the headline")
+    parser.add_argument('--format', choices=sorted(FORMATS), default='png', help="output image format")
+    parser.add_argument('--max-lines', type=int, default=3, help="wrap headlines over at most this many lines")
+    parser.add_argument('--quality', type=int, default=85, help="WebP/JPEG quality")
+    parser.add_argument('--workers', type=int, default=0, help="render processes (default: one per core)")
+    parser.add_argument('--force', action='store_true', help="render every row, even if its output is up to date")
+
+
+def renderer_from_args(args, manifest_path: Optional[str] = None) -> OverlayRenderer:
+    return OverlayRenderer(args.font, args.format, args.quality, args.workers or None, args.max_lines,
+                           manifest_path=manifest_path, force=args.force)
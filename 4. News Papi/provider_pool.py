@@ -0,0 +1,141 @@
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderHealth:
+    """Rolling latency / error statistics for one api_configs entry"""
+
+    WINDOW = 20
+    DEFAULT_LATENCY = 1.0  # optimistic guess so untried providers get traffic
+
+    def __init__(self, config: Dict):
+        self.config = config
+        self.latencies = deque(maxlen=self.WINDOW)
+        self.outcomes = deque(maxlen=self.WINDOW)
+        self.in_flight = 0
+        self.consecutive_failures = 0
+        self.disabled_until = 0.0
+        self.throttled_until = 0.0  # paused after a 429; not a health problem
+
+    def available_at(self) -> float:
+        return max(self.disabled_until, self.throttled_until)
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1.0 - sum(self.outcomes) / len(self.outcomes)
+
+    @property
+    def avg_latency(self) -> float:
+        if not self.latencies:
+            return self.DEFAULT_LATENCY
+        return sum(self.latencies) / len(self.latencies)
+
+    def score(self) -> float:
+        """Lower is healthier: slow, failing or busy providers are pushed back"""
+        return self.avg_latency * (1 + 4 * self.error_rate) * (1 + self.in_flight)
+
+
+class ProviderPool:
+    """
+    Load-balances requests across every configured provider at once.
+    Each call goes to the healthiest available provider; providers that fail
+    are put in a cooldown and retried (probed) once it expires.
+    """
+
+    BASE_COOLDOWN = 5.0
+    MAX_COOLDOWN = 300.0
+    AUTH_COOLDOWN = 600.0
+
+    def __init__(self, api_configs: List[Dict]):
+        self.providers = [ProviderHealth(config) for config in api_configs]
+        self.lock = threading.Lock()
+
+    def _find(self, config: Dict) -> Optional[ProviderHealth]:
+        for provider in self.providers:
+            if provider.config is config:
+                return provider
+        return None
+
+    def acquire(self, exclude: Optional[Set[str]] = None) -> Optional[Dict]:
+        """Pick the healthiest provider not in 'exclude' and mark it in flight"""
+        exclude = exclude or set()
+        with self.lock:
+            now = time.monotonic()
+            candidates = [p for p in self.providers if p.config['name'] not in exclude]
+            if not candidates:
+                return None
+
+            ready = [p for p in candidates if p.available_at() <= now]
+            if ready:
+                chosen = min(ready, key=lambda p: p.score())
+            else:
+                # Everything is cooling down or throttled - use whichever comes back first
+                chosen = min(candidates, key=lambda p: p.available_at())
+
+            chosen.in_flight += 1
+            return chosen.config
+
+    def report_success(self, config: Dict, latency: float) -> None:
+        with self.lock:
+            provider = self._find(config)
+            if not provider:
+                return
+            provider.in_flight = max(0, provider.in_flight - 1)
+            provider.latencies.append(latency)
+            provider.outcomes.append(True)
+            if provider.consecutive_failures:
+                logger.info(f"{config['name']} is healthy again")
+            provider.consecutive_failures = 0
+            provider.disabled_until = 0.0
+
+    def report_failure(self, config: Dict, latency: Optional[float] = None, auth_failed: bool = False) -> None:
+        with self.lock:
+            provider = self._find(config)
+            if not provider:
+                return
+            provider.in_flight = max(0, provider.in_flight - 1)
+            if latency is not None:
+                provider.latencies.append(latency)
+            provider.outcomes.append(False)
+            provider.consecutive_failures += 1
+
+            if auth_failed:
+                cooldown = self.AUTH_COOLDOWN
+            else:
+                cooldown = min(self.MAX_COOLDOWN, self.BASE_COOLDOWN * 2 ** (provider.consecutive_failures - 1))
+            provider.disabled_until = time.monotonic() + cooldown
+            logger.info(f"{config['name']} cooling down for {cooldown:.0f}s "
+                        f"(error rate {provider.error_rate:.0%}, {provider.consecutive_failures} failures in a row)")
+
+    def release(self, config: Dict, throttled_for: float = 0.0) -> None:
+        """
+        Drop the in-flight mark without recording an outcome. After a 429 pass the
+        rate limiter's pause, so other providers are picked until it is over.
+        """
+        with self.lock:
+            provider = self._find(config)
+            if provider:
+                provider.in_flight = max(0, provider.in_flight - 1)
+                if throttled_for > 0:
+                    provider.throttled_until = max(provider.throttled_until, time.monotonic() + throttled_for)
+
+    def summary(self) -> List[Dict]:
+        """Snapshot of per-provider health for logging"""
+        with self.lock:
+            return [
+                {
+                    'name': p.config['name'],
+                    'avg_latency': round(p.avg_latency, 3),
+                    'error_rate': round(p.error_rate, 3),
+                    'cooling_down': p.disabled_until > time.monotonic(),
+                    'throttled': p.throttled_until > time.monotonic()
+                }
+                for p in self.providers
+            ]
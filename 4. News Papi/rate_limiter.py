@@ -0,0 +1,130 @@
+import time
+import logging
+import threading
+import email.utils
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Turn a Retry-After header (seconds or HTTP date) into seconds to wait"""
+    if not value:
+        return None
+
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        logger.debug(f"Could not parse Retry-After header: {value}")
+        return None
+
+
+class TokenBucket:
+    """Thread-safe token bucket: 'rate' tokens per second, bursts up to 'capacity'"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float, rate: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+
+    def reserve(self, scale: float = 1.0) -> float:
+        """Take one token and return how long the caller must wait before using it"""
+        rate = self.rate * scale
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now, rate)
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            # Token is borrowed from the future; the debt is paid back by the refill
+            return -self.tokens / rate
+
+
+class ProviderLimiter:
+    """Rate limits for one provider: optional RPS and RPM buckets plus 429 back-off"""
+
+    # Additive increase / multiplicative decrease of the allowed rate
+    MIN_SCALE = 0.05
+    RECOVERY_STEP = 0.05
+
+    def __init__(self, name: str, requests_per_second: Optional[float] = None,
+                 requests_per_minute: Optional[float] = None):
+        self.name = name
+        self.buckets = []
+        if requests_per_second:
+            self.buckets.append(TokenBucket(requests_per_second, max(1.0, requests_per_second)))
+        if requests_per_minute:
+            self.buckets.append(TokenBucket(requests_per_minute / 60.0, max(1.0, requests_per_minute)))
+
+        self.scale = 1.0
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Block until a request may be sent, return the time spent waiting"""
+        with self.lock:
+            scale = self.scale
+            blocked_wait = self.blocked_until - time.monotonic()
+
+        wait = max([0.0, blocked_wait] + [bucket.reserve(scale) for bucket in self.buckets])
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def record_success(self) -> None:
+        """Slowly creep back up to the configured ceiling after a throttle"""
+        with self.lock:
+            self.scale = min(1.0, self.scale + self.RECOVERY_STEP)
+
+    def record_rate_limited(self, retry_after: Optional[float] = None) -> float:
+        """Halve the rate and pause the provider after a 429, return the pause length"""
+        with self.lock:
+            self.scale = max(self.MIN_SCALE, self.scale * 0.5)
+            if retry_after is None:
+                # No hint from the server - back off for roughly one refill at the new rate
+                slowest = min((bucket.rate for bucket in self.buckets), default=1.0)
+                retry_after = 1.0 / (slowest * self.scale)
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+            logger.warning(f"{self.name} rate limited - pausing {retry_after:.1f}s, rate now {self.scale:.0%} of limit")
+            return retry_after
+
+
+class RateLimiter:
+    """Registry of per-provider limiters keyed by api_configs 'name'"""
+
+    def __init__(self):
+        self.providers: Dict[str, ProviderLimiter] = {}
+        self.lock = threading.Lock()
+
+    def register(self, config: Dict) -> ProviderLimiter:
+        """Create (or return) the limiter for an api_configs entry"""
+        with self.lock:
+            if config['name'] not in self.providers:
+                self.providers[config['name']] = ProviderLimiter(
+                    config['name'],
+                    requests_per_second=config.get('requests_per_second'),
+                    requests_per_minute=config.get('requests_per_minute')
+                )
+            return self.providers[config['name']]
+
+    def acquire(self, config: Dict) -> float:
+        return self.register(config).acquire()
+
+    def record_success(self, config: Dict) -> None:
+        self.register(config).record_success()
+
+    def record_rate_limited(self, config: Dict, retry_after_header: Optional[str] = None) -> float:
+        return self.register(config).record_rate_limited(parse_retry_after(retry_after_header))
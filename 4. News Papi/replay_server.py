@@ -0,0 +1,261 @@
+"""
+Local stand-in for the OpenRouter chat endpoint and the pollinations image endpoint,
+so the processor can be run and benchmarked without touching either service.
+
+    POST /api/v1/chat/completions   OpenRouter-shaped reply
+    GET  /prompt/<text>             a PNG of --image-kb kilobytes
+
+Chat replies come from a fixtures file when one matches ({"contains": ..., "response": ...}
+per JSONL line, first match wins); anything else gets a synthetic answer in the shape the
+processor asked for (JSON object, JSON array or plain text). Latency, 5xx errors and 429s
+with Retry-After are injected at the configured rates.
+
+Run standalone and point the processor at it:
+    python replay_server.py --port 8765 --latency 0.8 --rate-limit-rate 0.05
+    NEWS_LLM_BASE_URL=http://127.0.0.1:8765/api/v1/chat/completions \\
+    NEWS_IMAGE_URL=http://127.0.0.1:8765/prompt/ python news-processor.py
+"""
+import re
+import json
+import time
+import random
+import struct
+import zlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from llm_backends import StubBackend
+
+HEADLINE_PATTERN = re.compile(r'^Headline: (.*)$', flags=re.MULTILINE)
+DESCRIPTION_PATTERN = re.compile(r'^Description: (.*)$', flags=re.MULTILINE)
+
+
+def make_png(size_bytes: int) -> bytes:
+    """A valid 1x1 PNG padded with an ancillary chunk to roughly size_bytes"""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    header = chunk(b'IHDR', struct.pack('>IIBBBBB', 1, 1, 8, 2, 0, 0, 0))
+    pixels = chunk(b'IDAT', zlib.compress(b'\x00\x80\x80\x80'))
+    padding = chunk(b'rpLy', b'\x00' * max(0, size_bytes - 70))
+    return b'\x89PNG\r\n\x1a\n' + header + padding + pixels + chunk(b'IEND', b'')
+
+
+class ReplayConfig:
+    def __init__(self, latency: float = 0.5, jitter: float = 0.2, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, retry_after: float = 1.0, image_latency: float = 1.0,
+                 image_kb: int = 150, fixtures: Optional[List[Dict]] = None, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.image_latency = image_latency
+        self.image_bytes = make_png(image_kb * 1024)
+        self.fixtures = fixtures or []
+        self.random = random.Random(seed)
+
+
+class ReplayStats:
+    """Request counters the benchmark reads back after a run"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = {
+            'llm_requests': 0, 'llm_errors': 0, 'llm_rate_limited': 0,
+            'prompt_tokens': 0, 'completion_tokens': 0,
+            'image_requests': 0, 'image_bytes': 0
+        }
+
+    def add(self, **amounts) -> None:
+        with self.lock:
+            for key, amount in amounts.items():
+                self.counts[key] += amount
+
+    def snapshot(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.counts)
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly four characters per token, as the OpenAI tokenizers average on English"""
+    return max(1, len(text) // 4)
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real services
+
+    def log_message(self, format, *args):
+        pass  # the processor's own logging is plenty
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict] = None) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _delay(self, base: float) -> None:
+        config = self.server.config
+        time.sleep(max(0.0, base + config.random.uniform(-config.jitter, config.jitter)))
+
+    def _injected_failure(self) -> bool:
+        """Send a 429 or a 5xx at the configured rates; True if one was sent"""
+        config, stats = self.server.config, self.server.stats
+        roll = config.random.random()
+        if roll < config.rate_limit_rate:
+            stats.add(llm_rate_limited=1)
+            self._send(429, b'{"error": "rate limited"}', 'application/json',
+                       {'Retry-After': f"{config.retry_after:g}"})
+            return True
+        if roll < config.rate_limit_rate + config.error_rate:
+            stats.add(llm_errors=1)
+            self._send(503, b'{"error": "upstream unavailable"}', 'application/json')
+            return True
+        return False
+
+    def _answer(self, content: str) -> str:
+        for fixture in self.server.config.fixtures:
+            if fixture.get('contains') and fixture['contains'] in content:
+                return fixture['response']
+
+        stub = StubBackend()
+        if "JSON array" in content:
+            return stub.generate(content, content)[0]
+        if "JSON object" in content:
+            headline = HEADLINE_PATTERN.search(content)
+            description = DESCRIPTION_PATTERN.search(content)
+            prompt = f"Headline: {headline.group(1) if headline else ''}\nDescription: {description.group(1) if description else ''}"
+            return stub.generate(prompt, "JSON object")[0]
+        last_line = content.strip().splitlines()[-1] if content.strip() else ""
+        return f"Rewritten: {last_line[-200:]}"
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send(404, b'{"error": "not found"}', 'application/json')
+            return
+
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.stats.add(llm_requests=1)
+        self._delay(self.server.config.latency)
+        if self._injected_failure():
+            return
+
+        try:
+            payload = json.loads(body)
+            content = "".join(message.get('content', '') for message in payload.get('messages', []))
+        except (ValueError, AttributeError):
+            self._send(400, b'{"error": "bad request"}', 'application/json')
+            return
+
+        answer = self._answer(content)
+        usage = {'prompt_tokens': estimate_tokens(content), 'completion_tokens': estimate_tokens(answer)}
+        self.server.stats.add(**usage)
+        reply = {
+            'id': f"replay-{time.monotonic_ns()}",
+            'model': payload.get('model'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': answer}, 'finish_reason': 'stop'}],
+            'usage': dict(usage, total_tokens=sum(usage.values()))
+        }
+        self._send(200, json.dumps(reply).encode('utf-8'), 'application/json')
+
+    def do_GET(self):
+        if not self.path.startswith('/prompt/'):
+            self._send(404, b'not found', 'text/plain')
+            return
+        self.server.stats.add(image_requests=1, image_bytes=len(self.server.config.image_bytes))
+        self._delay(self.server.config.image_latency)
+        self._send(200, self.server.config.image_bytes, 'image/png')
+
+
+class ReplayServer:
+    """Threaded replay server on a background thread; use as a context manager"""
+
+    def __init__(self, config: Optional[ReplayConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.httpd = ThreadingHTTPServer((host, port), ReplayHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.config = config or ReplayConfig()
+        self.httpd.stats = ReplayStats()
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def chat_url(self) -> str:
+        return self.base_url + "/api/v1/chat/completions"
+
+    @property
+    def image_url(self) -> str:
+        return self.base_url + "/prompt/"
+
+    @property
+    def stats(self) -> ReplayStats:
+        return self.httpd.stats
+
+    def start(self) -> 'ReplayServer':
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def load_fixtures(path: Optional[str]) -> List[Dict]:
+    if not path:
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Fault-injection options, shared with benchmark.py"""
+    parser.add_argument('--latency', type=float, default=0.5, help="mean LLM latency in seconds")
+    parser.add_argument('--jitter', type=float, default=0.2, help="uniform +/- jitter on every delay")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of LLM calls answered with 503")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="share of LLM calls answered with 429")
+    parser.add_argument('--retry-after', type=float, default=1.0, help="Retry-After sent with each 429")
+    parser.add_argument('--image-latency', type=float, default=1.0, help="image render time in seconds")
+    parser.add_argument('--image-kb', type=int, default=150, help="size of each served image")
+    parser.add_argument('--fixtures', help="JSONL of {\"contains\", \"response\"} canned chat replies")
+    parser.add_argument('--seed', type=int, help="seed for reproducible fault injection")
+
+
+def config_from_args(args) -> ReplayConfig:
+    return ReplayConfig(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after,
+        image_latency=args.image_latency, image_kb=args.image_kb,
+        fixtures=load_fixtures(args.fixtures), seed=args.seed
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline stand-in for the LLM and image endpoints")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8765)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    server = ReplayServer(config_from_args(args), args.host, args.port)
+    print(f"Replay server on {server.base_url}")
+    print(f"  NEWS_LLM_BASE_URL={server.chat_url}")
+    print(f"  NEWS_IMAGE_URL={server.image_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nServed: {server.stats.snapshot()}")
+        server.httpd.server_close()
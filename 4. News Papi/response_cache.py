@@ -0,0 +1,143 @@
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Callable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """
+    Persistent LLM response cache in SQLite, keyed by hash(model, system_message, prompt).
+    Entries expire after ttl_seconds; when the cache grows past max_entries or
+    max_bytes the least recently used entries are evicted. Eviction runs every
+    EVICT_EVERY writes rather than on each one, so the limits are soft by that much.
+    """
+
+    EVICT_EVERY = 100
+
+    def __init__(self, path: str = "llm_cache.sqlite", ttl_seconds: Optional[float] = 7 * 24 * 3600,
+                 max_entries: int = 50000, max_bytes: int = 200 * 1024 * 1024):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.puts_since_evict = self.EVICT_EVERY  # check the limits on the first write
+        self.lock = threading.Lock()
+
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT,"
+            " response TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_responses_created_at ON responses(created_at)")
+        self.connection.commit()
+
+    @staticmethod
+    def make_key(model: str, system_message: str, prompt: str) -> str:
+        content = "\x00".join([model or "", system_message or "", prompt or ""])
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def _lookup(self, key: str) -> Optional[str]:
+        """Fetch a live entry and bump its LRU timestamp (caller holds the lock)"""
+        now = time.time()
+        row = self.connection.execute(
+            "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+            self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.connection.commit()
+            return None
+        if not row:
+            return None
+        self.connection.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        self.connection.commit()
+        return row[0]
+
+    def get_any(self, models: Iterable[str], system_message: str, prompt: str,
+                accept: Optional[Callable[[str], bool]] = None) -> Optional[str]:
+        """
+        Return the cached response produced by any of the given models, or None.
+        Entries that accept rejects are deleted and count as misses.
+        """
+        try:
+            with self.lock:
+                for model in models:
+                    key = self.make_key(model, system_message, prompt)
+                    response = self._lookup(key)
+                    if response is None:
+                        continue
+                    if accept is not None and not accept(response):
+                        self.connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                        self.connection.commit()
+                        continue
+                    self.hits += 1
+                    return response
+                self.misses += 1
+                return None
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache read failed: {e}")
+            return None
+
+    def put(self, model: str, system_message: str, prompt: str, response: str) -> None:
+        if not response:
+            return
+        key = self.make_key(model, system_message, prompt)
+        now = time.time()
+        try:
+            with self.lock:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, model, response, len(response.encode('utf-8')), now, now)
+                )
+                self.puts_since_evict += 1
+                if self.puts_since_evict >= self.EVICT_EVERY:
+                    self._evict()
+                    self.puts_since_evict = 0
+                self.connection.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache write failed: {e}")
+
+    def _evict(self) -> None:
+        """Drop expired entries, then least recently used ones until under the limits"""
+        if self.ttl_seconds is not None:
+            self.connection.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+
+        count, total_bytes = self.connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        if count <= self.max_entries and total_bytes <= self.max_bytes:
+            return
+
+        # Walk from the oldest entry until enough has been freed
+        excess_entries = max(0, count - self.max_entries)
+        excess_bytes = max(0, total_bytes - self.max_bytes)
+        doomed = []
+        for key, size in self.connection.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            if excess_entries <= 0 and excess_bytes <= 0:
+                break
+            doomed.append((key,))
+            excess_entries -= 1
+            excess_bytes -= size
+        self.connection.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        logger.debug(f"Response cache evicted {len(doomed)} entries")
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0
+        }
@@ -0,0 +1,136 @@
+import os
+import json
+import math
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class StageTimer:
+    """Handed out by StageMetrics.time(); the block fills in bytes and failures"""
+
+    def __init__(self):
+        self.bytes = 0
+        self.ok = True
+
+    def fail(self) -> None:
+        self.ok = False
+
+
+class StageMetrics:
+    """
+    Per-stage latency, error and byte counters for one pipeline run.
+    Every call is kept (a run is at most a few thousand calls), so the
+    p50/p95/p99 figures are exact rather than estimated. Thread-safe.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.bytes: Dict[str, int] = {}
+        self.started = time.time()
+
+    def record(self, stage: str, seconds: float, ok: bool = True, bytes_transferred: int = 0) -> None:
+        with self.lock:
+            self.samples.setdefault(stage, []).append(seconds)
+            self.errors[stage] = self.errors.get(stage, 0) + (0 if ok else 1)
+            self.bytes[stage] = self.bytes.get(stage, 0) + bytes_transferred
+
+    @contextmanager
+    def time(self, stage: str):
+        """Time a block; an exception escaping it counts as an error"""
+        timer = StageTimer()
+        started = time.monotonic()
+        try:
+            yield timer
+        except Exception:
+            timer.ok = False
+            raise
+        finally:
+            self.record(stage, time.monotonic() - started, timer.ok, timer.bytes)
+
+    def summary(self) -> Dict:
+        with self.lock:
+            stages = {}
+            for stage, samples in self.samples.items():
+                ordered = sorted(samples)
+                count = len(ordered)
+                stages[stage] = {
+                    'count': count,
+                    'errors': self.errors.get(stage, 0),
+                    'error_rate': round(self.errors.get(stage, 0) / count, 4) if count else 0.0,
+                    'total_seconds': round(sum(ordered), 4),
+                    'p50_seconds': round(percentile(ordered, 0.50), 4),
+                    'p95_seconds': round(percentile(ordered, 0.95), 4),
+                    'p99_seconds': round(percentile(ordered, 0.99), 4),
+                    'max_seconds': round(ordered[-1], 4) if ordered else 0.0,
+                    'bytes': self.bytes.get(stage, 0)
+                }
+        return {
+            'started': self.started,
+            'wall_seconds': round(time.time() - self.started, 3),
+            'stages': stages
+        }
+
+    def write_json(self, path: str, extra: Optional[Dict] = None) -> Dict:
+        summary = dict(self.summary(), **(extra or {}))
+        temp_path = path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        os.replace(temp_path, path)
+        return summary
+
+    def write_prometheus(self, path: str, prefix: str = "news_pipeline") -> None:
+        """Write a node_exporter textfile-collector file (renamed into place, as the collector expects)"""
+        summary = self.summary()
+        lines = [
+            f"# HELP {prefix}_stage_seconds Stage latency quantiles for the last run.",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        for stage, stats in sorted(summary['stages'].items()):
+            for quantile, key in (('0.5', 'p50_seconds'), ('0.95', 'p95_seconds'), ('0.99', 'p99_seconds')):
+                lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{quantile}"}} {stats[key]}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {stats["total_seconds"]}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {stats["count"]}')
+
+        for name, key, help_text in (
+            ('stage_errors_total', 'errors', 'Failed calls per stage in the last run.'),
+            ('stage_bytes_total', 'bytes', 'Bytes transferred per stage in the last run.'),
+        ):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            for stage, stats in sorted(summary['stages'].items()):
+                lines.append(f'{prefix}_{name}{{stage="{stage}"}} {stats[key]}')
+
+        lines.append(f"# HELP {prefix}_last_run_seconds Wall-clock length of the last run.")
+        lines.append(f"# TYPE {prefix}_last_run_seconds gauge")
+        lines.append(f"{prefix}_last_run_seconds {summary['wall_seconds']}")
+
+        temp_path = path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(temp_path, path)
+
+    def format_table(self) -> str:
+        """Compact per-stage table for the end-of-run printout"""
+        rows = [f"{'stage':<16}{'count':>7}{'err%':>7}{'p50 s':>9}{'p95 s':>9}{'p99 s':>9}{'total s':>10}{'KB':>10}"]
+        for stage, stats in sorted(self.summary()['stages'].items()):
+            rows.append(
+                f"{stage:<16}{stats['count']:>7}{stats['error_rate'] * 100:>7.1f}"
+                f"{stats['p50_seconds']:>9.3f}{stats['p95_seconds']:>9.3f}{stats['p99_seconds']:>9.3f}"
+                f"{stats['total_seconds']:>10.2f}{stats['bytes'] / 1024:>10.1f}"
+            )
+        return "\n".join(rows)
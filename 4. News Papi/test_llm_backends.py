@@ -0,0 +1,42 @@
+import json
+
+from llm_backends import OllamaBackend, is_lead_in
+
+
+class FakeStream:
+    """Ollama /api/generate NDJSON stream, one chunk per piece of text"""
+
+    def __init__(self, pieces):
+        self.pieces = pieces
+
+    def iter_lines(self):
+        for piece in self.pieces:
+            yield json.dumps({'response': piece}).encode('utf-8')
+        yield json.dumps({'response': '', 'done': True}).encode('utf-8')
+
+
+def read_first_line(pieces):
+    backend = OllamaBackend.__new__(OllamaBackend)  # no server needed to read a stream
+    return backend._read_stream(FakeStream(pieces), single_line=True)[0]
+
+
+def test_lead_in_lines():
+    assert is_lead_in("Here is the rewritten headline:")
+    assert is_lead_in("**Headline:**")
+    assert is_lead_in("  _Headline_: ")
+    assert is_lead_in("### Rewritten headline:")
+    assert not is_lead_in("Ruto signs Finance Bill into law")
+    assert not is_lead_in("**Ruto signs Finance Bill into law**")
+
+
+def test_single_line_skips_plain_lead_in():
+    assert read_first_line(["Here is the headline:", "\n", "Big ", "News", "\n", "more"]) == "Big News"
+
+
+def test_single_line_skips_markdown_lead_in():
+    assert read_first_line(["**Headline:**", "\n\n", "Ruto signs ", "Finance Bill", "\n", "Extra"]) == \
+        "Ruto signs Finance Bill"
+
+
+def test_single_line_keeps_plain_answer():
+    assert read_first_line(["Ruto signs Finance Bill", "\n", "Second line"]) == "Ruto signs Finance Bill"
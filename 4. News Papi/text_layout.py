@@ -0,0 +1,114 @@
+"""
+Word-wrapping layout for text drawn onto images.
+
+Instead of shrinking a headline until it fits on one line (which leaves long
+headlines unreadably small), the text is wrapped over a few lines and the
+largest font size whose wrapped block fits the box is chosen by binary search.
+
+Measuring is the slow part with decorative fonts (several milliseconds per
+call for Rye), so advance widths are measured once per character per
+(font, size) and every later width is a sum of cached numbers. With the kind of
+font this project uses (no ligatures, no complex shaping) that sum matches
+FreeType's own line length exactly.
+"""
+from functools import lru_cache
+from typing import Dict, List, NamedTuple
+
+from PIL import ImageFont
+
+
+@lru_cache(maxsize=128)
+def load_font(font_path: str, size: int):
+    """Font at a given size, loaded from disk once per process"""
+    try:
+        return ImageFont.truetype(font_path, size)
+    except IOError:
+        # Fallback to default PIL font if the font file is not found
+        return ImageFont.load_default()
+
+
+class GlyphWidths:
+    """Memoised advance widths for one font at one size"""
+
+    def __init__(self, font):
+        self.font = font
+        self.widths: Dict[str, float] = {}
+        ascent, descent = font.getmetrics()
+        self.line_height = ascent + descent
+
+    def width(self, text: str) -> float:
+        total = 0.0
+        for char in text:
+            advance = self.widths.get(char)
+            if advance is None:
+                advance = self.widths[char] = self.font.getlength(char)
+            total += advance
+        return total
+
+
+@lru_cache(maxsize=128)
+def glyph_widths(font_path: str, size: int) -> GlyphWidths:
+    return GlyphWidths(load_font(font_path, size))
+
+
+class TextLayout(NamedTuple):
+    size: int
+    lines: List[str]
+    line_widths: List[float]
+    line_height: int
+    line_spacing: int
+    width: float
+    height: int
+    fits: bool
+
+
+def wrap(text: str, font_path: str, size: int, max_width: float, line_spacing_ratio: float = 0.15) -> TextLayout:
+    """Greedy word wrap at one size; a word wider than max_width gets a line to itself (and fits=False)"""
+    metrics = glyph_widths(font_path, size)
+    space = metrics.width(" ")
+    lines: List[str] = []
+    widths: List[float] = []
+    line: List[str] = []
+    line_width = 0.0
+    fits = True
+
+    for word in text.split():
+        word_width = metrics.width(word)
+        if word_width > max_width:
+            fits = False
+        if line and line_width + space + word_width > max_width:
+            lines.append(" ".join(line))
+            widths.append(line_width)
+            line, line_width = [], 0.0
+        line_width = line_width + space + word_width if line else word_width
+        line.append(word)
+    if line:
+        lines.append(" ".join(line))
+        widths.append(line_width)
+
+    spacing = round(metrics.line_height * line_spacing_ratio)
+    height = len(lines) * metrics.line_height + max(0, len(lines) - 1) * spacing
+    return TextLayout(size, lines, widths, metrics.line_height, spacing,
+                      max(widths, default=0.0), height, fits)
+
+
+def fit_text(text: str, font_path: str, max_width: float, max_height: float, max_lines: int = 3,
+             min_size: int = 10, max_size: int = 40) -> TextLayout:
+    """
+    Largest layout in [min_size, max_size] whose wrapped text fits the box in at
+    most max_lines lines; the min_size layout if nothing fits. Bigger text never
+    needs fewer lines, so a binary search over sizes is enough.
+    """
+    def acceptable(layout: TextLayout) -> bool:
+        return layout.fits and len(layout.lines) <= max_lines and layout.height <= max_height
+
+    low, high = min_size, max_size
+    best = wrap(text, font_path, min_size, max_width)
+    while low < high:
+        middle = (low + high + 1) // 2
+        layout = wrap(text, font_path, middle, max_width)
+        if acceptable(layout):
+            low, best = middle, layout
+        else:
+            high = middle - 1
+    return best
@@ -0,0 +1,189 @@
+import os
+import csv
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TrackingStore:
+    """
+    Indexed SQLite store of already-processed articles, used for duplicate checks.
+    Lookups by url, headline and content hash hit B-tree indexes, so nothing is
+    loaded into memory at startup. An existing processed_tracking.csv is imported
+    once, the first time the database is created.
+    """
+
+    def __init__(self, path: str = "processed_tracking.db", legacy_csv: Optional[str] = None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS processed ("
+            " id INTEGER PRIMARY KEY,"
+            " original_headline TEXT,"
+            " url TEXT,"
+            " content_hash TEXT,"
+            " processed_date TEXT)"
+        )
+        for column in ('original_headline', 'url', 'content_hash'):
+            self.connection.execute(f"CREATE INDEX IF NOT EXISTS idx_processed_{column} ON processed({column})")
+
+        # SimHash fingerprints, split into bands for near-duplicate candidate lookup
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprints ("
+            " item_id INTEGER PRIMARY KEY REFERENCES processed(id),"
+            " fingerprint TEXT)"
+        )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprint_bands ("
+            " band INTEGER NOT NULL,"
+            " value INTEGER NOT NULL,"
+            " item_id INTEGER NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_fingerprint_bands ON fingerprint_bands(band, value)")
+        # Settings the stored data depends on, e.g. how many bands fingerprints were split into
+        self.connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.connection.commit()
+
+        if legacy_csv and self.count() == 0 and os.path.exists(legacy_csv):
+            self.import_csv(legacy_csv)
+
+    def import_csv(self, csv_path: str) -> int:
+        """Bulk-load rows from the old processed_tracking.csv format"""
+        try:
+            with open(csv_path, 'r', newline='', encoding='utf-8') as f:
+                rows = [
+                    (row.get('original_headline'), row.get('url'), row.get('content_hash'), row.get('processed_date'))
+                    for row in csv.DictReader(f)
+                ]
+            with self.lock:
+                self.connection.executemany(
+                    "INSERT INTO processed (original_headline, url, content_hash, processed_date) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+                self.connection.commit()
+            logger.info(f"Imported {len(rows)} tracking rows from {csv_path}")
+            return len(rows)
+        except Exception as e:
+            logger.warning(f"Error importing tracking CSV {csv_path}: {e}")
+            return 0
+
+    def _exists(self, column: str, value: str) -> bool:
+        with self.lock:
+            row = self.connection.execute(
+                f"SELECT 1 FROM processed WHERE {column} = ? LIMIT 1", (value,)
+            ).fetchone()
+        return row is not None
+
+    def has_url(self, url: str) -> bool:
+        return self._exists('url', url)
+
+    def has_headline(self, headline: str) -> bool:
+        return self._exists('original_headline', headline)
+
+    def has_content_hash(self, content_hash: str) -> bool:
+        return self._exists('content_hash', content_hash)
+
+    def add(self, headline: str, url: str, content_hash: str, processed_date: Optional[str] = None) -> int:
+        """Record a processed item and return its row id"""
+        with self.lock:
+            cursor = self.connection.execute(
+                "INSERT INTO processed (original_headline, url, content_hash, processed_date) VALUES (?, ?, ?, ?)",
+                (headline, url, content_hash, processed_date or datetime.now().isoformat())
+            )
+            self.connection.commit()
+            return cursor.lastrowid
+
+    def add_fingerprint(self, item_id: int, fingerprint: Optional[int], band_values: List[int]) -> None:
+        """Store an item's SimHash (None marks it as checked but too short to fingerprint)"""
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO fingerprints (item_id, fingerprint) VALUES (?, ?)",
+                (item_id, format(fingerprint, '016x') if fingerprint is not None else None)
+            )
+            self.connection.execute("DELETE FROM fingerprint_bands WHERE item_id = ?", (item_id,))
+            self.connection.executemany(
+                "INSERT INTO fingerprint_bands (band, value, item_id) VALUES (?, ?, ?)",
+                [(band, value, item_id) for band, value in enumerate(band_values)]
+            )
+            self.connection.commit()
+
+    def use_band_layout(self, bands: int, band_values: Callable[[int], List[int]]) -> int:
+        """
+        Make the stored bands match 'bands', re-splitting every stored fingerprint
+        with band_values if they were written with another layout (band values from
+        different layouts never match). Returns the number of items re-banded.
+        """
+        with self.lock:
+            row = self.connection.execute("SELECT value FROM meta WHERE key = 'fingerprint_bands'").fetchone()
+            if row and int(row[0]) == bands:
+                return 0
+            stored = self.connection.execute(
+                "SELECT item_id, fingerprint FROM fingerprints WHERE fingerprint IS NOT NULL"
+            ).fetchall()
+            self.connection.execute("DELETE FROM fingerprint_bands")
+            self.connection.executemany(
+                "INSERT INTO fingerprint_bands (band, value, item_id) VALUES (?, ?, ?)",
+                [(band, value, item_id)
+                 for item_id, fingerprint in stored
+                 for band, value in enumerate(band_values(int(fingerprint, 16)))]
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('fingerprint_bands', ?)", (str(bands),)
+            )
+            self.connection.commit()
+        if stored and row:
+            logger.info(f"Re-split {len(stored)} fingerprints from {row[0]} into {bands} bands")
+        return len(stored)
+
+    def fingerprint_candidates(self, band_values: List[int]) -> List[Dict]:
+        """Items sharing at least one fingerprint band with the given values"""
+        if not band_values:
+            return []
+        clauses = " OR ".join("(b.band = ? AND b.value = ?)" for _ in band_values)
+        params = [part for band, value in enumerate(band_values) for part in (band, value)]
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT DISTINCT p.id, p.original_headline, p.url, f.fingerprint "
+                "FROM fingerprint_bands b "
+                "JOIN fingerprints f ON f.item_id = b.item_id "
+                "JOIN processed p ON p.id = b.item_id "
+                f"WHERE {clauses}",
+                params
+            ).fetchall()
+        return [
+            {'id': row[0], 'headline': row[1], 'url': row[2], 'fingerprint': int(row[3], 16)}
+            for row in rows
+        ]
+
+    def items_without_fingerprint(self) -> Dict[str, int]:
+        """Map url -> row id for items recorded before fingerprints existed"""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT p.url, p.id FROM processed p "
+                "LEFT JOIN fingerprints f ON f.item_id = p.id WHERE f.item_id IS NULL"
+            ).fetchall()
+        return {url: item_id for url, item_id in rows}
+
+    def urls_since(self, row_id: int) -> List[tuple]:
+        """(id, url) pairs for rows added after row_id, oldest first"""
+        with self.lock:
+            return self.connection.execute(
+                "SELECT id, url FROM processed WHERE id > ? ORDER BY id", (row_id,)
+            ).fetchall()
+
+    def headlines_since(self, row_id: int) -> List[tuple]:
+        """(id, original_headline, url) rows added after row_id, oldest first"""
+        with self.lock:
+            return self.connection.execute(
+                "SELECT id, original_headline, url FROM processed WHERE id > ? ORDER BY id", (row_id,)
+            ).fetchall()
+
+    def count(self) -> int:
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM processed").fetchone()[0]
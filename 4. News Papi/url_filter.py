@@ -0,0 +1,116 @@
+import os
+import math
+import json
+import hashlib
+import logging
+from typing import Iterable, Optional
+
+from tracking_store import TrackingStore
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings using double hashing"""
+
+    def __init__(self, capacity: int = 100000, error_rate: float = 0.001):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size_bits = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size_bits / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value: str):
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'big')
+        second = int.from_bytes(digest[8:], 'big') | 1
+        for i in range(self.hash_count):
+            yield (first + i * second) % self.size_bits
+
+    def add(self, value: str) -> None:
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def update(self, values: Iterable[str]) -> None:
+        for value in values:
+            self.add(value)
+
+    def __contains__(self, value: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+    def save(self, path: str, **extra) -> None:
+        header = {
+            'capacity': self.capacity,
+            'error_rate': self.error_rate,
+            'count': self.count,
+            **extra
+        }
+        temp_path = path + ".tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(json.dumps(header).encode('utf-8') + b"\n")
+            f.write(self.bits)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str):
+        """Return (filter, header dict) from a file written by save()"""
+        with open(path, 'rb') as f:
+            header = json.loads(f.readline().decode('utf-8'))
+            bloom = cls(header['capacity'], header['error_rate'])
+            bits = f.read()
+        if len(bits) != len(bloom.bits):
+            raise ValueError("Bloom filter file does not match its header")
+        bloom.bits = bytearray(bits)
+        bloom.count = header.get('count', 0)
+        return bloom, header
+
+
+class ProcessedUrlFilter:
+    """
+    Persistent Bloom filter of URLs the processor has already handled.
+    The filter is topped up from the tracking store on open (only rows added
+    since the last save are read); positives are confirmed against the store,
+    so a false positive never causes a new article to be skipped.
+    """
+
+    def __init__(self, tracking_db: str = "processed_tracking.db", bloom_path: str = "processed_urls.bloom",
+                 legacy_csv: Optional[str] = "processed_tracking.csv"):
+        self.bloom_path = bloom_path
+        self.store = TrackingStore(tracking_db, legacy_csv=legacy_csv)
+        self.bloom = None
+        self.last_row_id = 0
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            if os.path.exists(self.bloom_path):
+                self.bloom, header = BloomFilter.load(self.bloom_path)
+                self.last_row_id = header.get('last_row_id', 0)
+        except Exception as e:
+            logger.warning(f"Could not read {self.bloom_path}, rebuilding: {e}")
+            self.bloom = None
+
+        new_rows = self.store.urls_since(self.last_row_id if self.bloom else 0)
+        total = (self.bloom.count if self.bloom else 0) + len(new_rows)
+
+        if self.bloom is None or total > self.bloom.capacity:
+            # Missing or full - rebuild with headroom from every tracked URL
+            self.bloom = BloomFilter(capacity=max(100000, total * 2))
+            self.last_row_id = 0
+            new_rows = self.store.urls_since(0)
+
+        for row_id, url in new_rows:
+            if url:
+                self.bloom.add(url)
+            self.last_row_id = max(self.last_row_id, row_id)
+
+        if new_rows:
+            self.bloom.save(self.bloom_path, last_row_id=self.last_row_id)
+        logger.info(f"URL filter ready: {self.bloom.count} processed URLs")
+
+    def is_processed(self, url: str) -> bool:
+        if url not in self.bloom:
+            return False
+        return self.store.has_url(url)